@@ -0,0 +1,138 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import ImportSnap
+from GenerateSnap import generate_collection_state
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+BENCHMARK_PATH = 'benchmark.json'
+
+def benchmark_stages(collection_path, output_dir, measure_memory=True):
+    """Time every pipeline stage on one collection file.
+
+    Each stage runs once untraced for its wall time and, with
+    measure_memory, a second time under tracemalloc for its peak memory,
+    so the tracing overhead doesn't distort the timings.
+    """
+    table = None
+    stats = None
+    time_index = None
+
+    def extract():
+        for _ in ImportSnap.extract_cards_section(collection_path):
+            pass
+
+    def process():
+        nonlocal table
+        table = ImportSnap.process_collection_state(collection_path)
+
+    def analyze():
+        nonlocal stats
+        stats = ImportSnap.analyze_splits(table)
+
+    def index():
+        nonlocal time_index
+        time_index = ImportSnap.TimeIndex(table)
+
+    stages = [
+        ('extract_cards_section', extract),
+        ('process_collection_state', process),
+        ('analyze_splits', analyze),
+        ('time_index', index),
+        ('write_statistics', lambda: ImportSnap.write_statistics(stats, os.path.join(output_dir, ImportSnap.STATISTICS_PATH), time_index)),
+        ('write_html_summary', lambda: ImportSnap.write_html_summary(stats, os.path.join(output_dir, ImportSnap.SUMMARY_PATH))),
+        ('write_card_table', lambda: ImportSnap.write_card_table(ImportSnap.CardIndex(table, stats), os.path.join(output_dir, ImportSnap.CARDS_PATH))),
+        ('write_report', lambda: ImportSnap.write_report(table, stats, os.path.join(output_dir, ImportSnap.REPORT_PATH), time_index)),
+        ('write_rawlist', lambda: ImportSnap.write_rawlist(table, os.path.join(output_dir, ImportSnap.RAWLIST_PATH))),
+        ('export_csv', lambda: ImportSnap.write_export(table, os.path.join(output_dir, 'splits.csv'))),
+        ('export_ndjson', lambda: ImportSnap.write_export(table, os.path.join(output_dir, 'splits.ndjson'))),
+    ]
+    if ImportSnap.pa is not None:
+        stages.append(('export_arrow', lambda: ImportSnap.write_export(table, os.path.join(output_dir, 'splits.arrow'))))
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, stage in stages:
+            start = time.perf_counter()
+            stage()
+            results[name] = {'seconds': time.perf_counter() - start}
+
+            if measure_memory:
+                tracemalloc.start()
+                stage()
+                results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+    return results, len(table)
+
+def run_benchmarks(sizes, seed=0, measure_memory=True):
+    """Generate a synthetic collection of every size and benchmark the pipeline on it."""
+    runs = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            collection_path = os.path.join(work_dir, f"CollectionState-{size}.json")
+            generate_collection_state(collection_path, size, seed)
+            stages, splits = benchmark_stages(collection_path, work_dir, measure_memory)
+            runs.append({
+                'cards': size,
+                'splits': splits,
+                'file_bytes': os.path.getsize(collection_path),
+                'stages': stages,
+            })
+            os.remove(collection_path)
+
+            total = sum(stage['seconds'] for stage in stages.values())
+            print(f"{size} cards, {splits} splits: {total:.2f}s")
+            for name, stage in stages.items():
+                peak = f", peak {stage['peak_bytes'] / 1024 / 1024:.1f} MB" if 'peak_bytes' in stage else ""
+                print(f"  {name}: {stage['seconds']:.3f}s{peak}")
+
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': ImportSnap.np is not None,
+        'seed': seed,
+        'runs': runs,
+    }
+
+def compare_benchmarks(previous, current):
+    """Print each stage's time relative to an earlier benchmark file at the same sizes."""
+    earlier = {run['cards']: run['stages'] for run in previous['runs']}
+    for run in current['runs']:
+        stages = earlier.get(run['cards'])
+        if stages is None:
+            continue
+        print(f"{run['cards']} cards compared to baseline:")
+        for name, stage in run['stages'].items():
+            if name in stages and stages[name]['seconds'] > 0:
+                ratio = stage['seconds'] / stages[name]['seconds']
+                print(f"  {name}: {ratio:.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every ImportSnap stage on synthetic collections.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="collection sizes in cards (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('-o', '--output', default=BENCHMARK_PATH, help="where to save the results as JSON")
+    parser.add_argument('--compare', metavar='BASELINE', help="earlier results to compare against")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.seed, not args.no_memory)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            compare_benchmarks(json.load(file), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+# Roughly how often each outcome turns up on a split that can roll it
+PRISM_RATE = 0.3
+INK_RATE = 0.12
+GOLD_RATE = 0.12
+COMIC_RATE = 0.08
+GLIMMER_RATE = 0.08
+SPARKLE_RATE = 0.08
+KIRBY_RATE = 0.06
+
+# Share of entries that are custom cards, and of flares that have a color
+CUSTOM_RATE = 0.03
+COLORED_FLARE_RATE = 0.6
+
+FLARE_COLORS = ["Black", "Gold", "Green", "Blue", "Red", "White", "Purple"]
+COLLECTION_START = datetime(2022, 10, 18, tzinfo=timezone.utc)
+COLLECTION_END = datetime(2024, 10, 18, tzinfo=timezone.utc)
+
+def card_names(count):
+    """Return count made up CardDefIds in the game's CamelCase style."""
+    first = ["Iron", "Squirrel", "Moon", "Star", "Silver", "Black", "Ghost", "Captain", "Doctor", "Night",
+             "Scarlet", "Shadow", "Storm", "Winter", "Jade", "Crimson", "Cosmic", "Mister", "Ms", "Hell"]
+    second = ["Man", "Girl", "Knight", "Lord", "Surfer", "Panther", "Rider", "Marvel", "Strange", "Crawler",
+              "Witch", "King", "Queen", "Soldier", "Claw", "Dynamo", "Fist", "Hawk", "Widow", "Cat"]
+    names = [a + b for a in first for b in second]
+    return [names[i % len(names)] + ("" if i < len(names) else str(i // len(names))) for i in range(count)]
+
+def time_created(timestamp):
+    return f"{timestamp:%Y-%m-%dT%H:%M:%S}.{timestamp.microsecond // 1000:03d}Z"
+
+def split_effects(rng, split_number):
+    """Roll the background and flare of a card's split_number-th split."""
+    surface = "Foil"
+    if split_number >= 5 and rng.random() < GOLD_RATE:
+        surface = "GoldFoil"
+    elif split_number >= 4 and rng.random() < INK_RATE:
+        surface = "Ink"
+    elif split_number >= 2 and rng.random() < PRISM_RATE:
+        surface = "PrismFoil"
+
+    flare = None
+    roll = rng.random()
+    if split_number >= 6 and roll < KIRBY_RATE:
+        flare = "Kirby"
+    elif split_number >= 5 and roll < KIRBY_RATE + SPARKLE_RATE:
+        flare = "Sparkle"
+    elif split_number >= 2 and roll < KIRBY_RATE + SPARKLE_RATE + COMIC_RATE:
+        flare = "Comic"
+    elif split_number >= 2 and roll < KIRBY_RATE + SPARKLE_RATE + COMIC_RATE + GLIMMER_RATE:
+        flare = "Glimmer"
+    if flare and rng.random() < COLORED_FLARE_RATE:
+        flare += rng.choice(FLARE_COLORS)
+    return surface, flare
+
+def generate_cards(rng, size):
+    """Yield size entries for the "Cards" array, mixing splits, base cards and custom cards."""
+    # About a third of entries are base variants, the rest are splits spread unevenly over cards
+    names = card_names(max(1, size // 12))
+    cum_weights = list(accumulate(1 / (rank + 1) ** 0.6 for rank in range(len(names))))
+    split_counts = {}
+
+    # Entries come out in chronological order, so split numbers are rolled in the order they happened
+    step = (COLLECTION_END - COLLECTION_START).total_seconds() / max(1, size)
+    for index in range(size):
+        name = rng.choices(names, cum_weights=cum_weights)[0]
+        timestamp = COLLECTION_START + timedelta(seconds=(index + rng.random()) * step)
+        card = {"$type": "CardState", "CardDefId": name, "ArtVariantDefId": name, "TimeCreated": time_created(timestamp)}
+
+        roll = rng.random()
+        if roll < CUSTOM_RATE:
+            card["SurfaceEffectDefId"] = rng.choice(["Foil", "PrismFoil", "Ink", "GoldFoil"])
+            card["Custom"] = True
+        elif roll > 0.35:
+            split_number = split_counts.get(name, 0) + 1
+            split_counts[name] = split_number
+            surface, flare = split_effects(rng, split_number)
+            card["SurfaceEffectDefId"] = surface
+            if flare:
+                card["CardRevealEffectDefId"] = flare
+        yield card
+
+def generate_collection_state(path, size, seed=0):
+    """Write a CollectionState.json with size entries in its "Cards" array.
+
+    The document is streamed to disk one card at a time, so very large
+    collections can be generated in constant memory. The same seed and
+    size always produce the same file.
+    """
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8-sig') as file:
+        file.write('{"ServerState": {"$type": "ServerState", "Avatars": [{"AvatarDefId": "Default"}], "CardBacks": ["Default"],\n"Cards": [\n')
+        for index, card in enumerate(generate_cards(rng, size)):
+            if index:
+                file.write(',\n')
+            file.write(json.dumps(card))
+        file.write('\n],\n"Decks": [{"Name": "Starter", "Cards": [{"CardDefId": "IronMan"}, {"CardDefId": "MsMarvel"}]}]}}\n')
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic CollectionState.json for testing and benchmarks.")
+    parser.add_argument('size', type=int, help="number of entries in the Cards array")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='CollectionState.json')
+    args = parser.parse_args()
+
+    generate_collection_state(args.output, args.size, args.seed)
+    print(f"Wrote {args.size} cards to {args.output}")
+
+if __name__ == "__main__":
+    main()
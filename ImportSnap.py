@@ -1,371 +1,2420 @@
+import argparse
+import bisect
+import contextlib
+import cProfile
+import glob
+import hashlib
+import heapq
+import html
 import json
+import mimetypes
+import mmap
+import operator
 import re
+import shutil
+import sqlite3
+import struct
 import subprocess
+import sys
 import os
-from datetime import datetime
+import threading
+import urllib.parse
+import time
+import tracemalloc
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate, compress, islice
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
 
 # Define paths for the output files
 RAWLIST_PATH = 'rawlist.txt'
 STATISTICS_PATH = 'statistics.txt'
 SUMMARY_PATH = 'summary.html'
+CARDS_PATH = 'cards.html'
+SIGNIFICANCE_PATH = 'significance.json'
+REPORT_PATH = 'report.html'
+CHECKPOINT_PATH = 'checkpoint.json'
+BATCH_OUTPUT_DIR = 'batch_output'
+BATCH_INDEX_NAME = 'index.json'
+BATCH_POOLED_NAME = 'pooled'
+STATS_STATE_SUFFIX = 'stats.json'
+# The pooled state is kept out of *.stats.json so merging a batch's states doesn't count it twice
+POOLED_STATE_SUFFIX = 'state.json'
+
+# Bumped whenever the saved SplitStatistics state changes shape
+STATS_STATE_VERSION = 4
+
+# Parse cache: entries are named <sha256 of the source>.splits
+CACHE_MAGIC = b'SNAPSPLT'
+CACHE_FORMAT_VERSION = 5
+CACHE_ENTRY_SUFFIX = 'splits'
+CACHE_STAT_SUFFIX = 'stat'
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Files summary.html needs next to it
+SUMMARY_ASSETS = ['styles.css', 'bg.png']
+
+# Bumped whenever the checkpoint contents change shape
+CHECKPOINT_VERSION = 6
+
+# History archive: every run's splits, kept across snapshots in one SQLite file
+ARCHIVE_PATH = 'history.sqlite'
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    splits INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS splits (
+    card TEXT NOT NULL,
+    surface TEXT NOT NULL,
+    reveal TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    first_snapshot INTEGER NOT NULL,
+    last_snapshot INTEGER NOT NULL,
+    UNIQUE (card, time, surface, reveal)
+);
+CREATE INDEX IF NOT EXISTS splits_time ON splits (time);
+"""
+
+# Snapshot diff: the fingerprint set of the last snapshot and the report of what changed since
+FINGERPRINT_PATH = 'snapshot.fingerprints'
+FINGERPRINT_MAGIC = b'SNAPFPRT'
+FINGERPRINT_VERSION = 2
+DIFF_PATH = 'diff.txt'
+
+# Number of entries kept on every leaderboard, and where batches save them
+LEADERBOARD_SIZE = 10
+SUMMARY_TOP_CARDS = 3
+LEADERBOARDS_NAME = 'leaderboards.json'
+
+# Split exports: the format for each file extension, how many splits are converted and written at a
+# time, and the suffix of the schema saved next to CSV and NDJSON exports
+EXPORT_FORMATS = {'.csv': 'csv', '.ndjson': 'ndjson', '.jsonl': 'ndjson', '.arrow': 'arrow', '.feather': 'arrow'}
+EXPORT_BATCH_SIZE = 1 << 16
+EXPORT_SCHEMA_SUFFIX = 'schema.json'
+
+# Daemon mode: where the summary is served and how often the collection file is checked, in seconds
+SERVE_HOST = '127.0.0.1'
+SERVE_PORT = 8765
+WATCH_INTERVAL = 1.0
+
+# Collections with at least this many splits are analyzed by card shards in parallel, smaller ones
+# finish before the worker processes would start
+SHARD_MIN_SPLITS = 500000
+
+# Number of characters read from CollectionState.json at a time
+READ_CHUNK_SIZE = 1 << 16
+
+# Patterns used while scanning for the "Cards" array
+SCAN_TOKEN_PATTERN = re.compile(r'[{}\[\]"]')
+STRING_BODY_PATTERN = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+ARRAY_OPEN_PATTERN = re.compile(r'\s*:\s*\[')
+PARTIAL_ARRAY_OPEN_PATTERN = re.compile(r'\s*(?::\s*)?')
+ELEMENT_SEPARATOR_PATTERN = re.compile(r'[\s,]*')
+# What can follow a decode error when the entry was only cut off at the end of the buffer
+UNFINISHED_TOKEN_PATTERN = re.compile(r'[^\s,:\[\]{}"]*')
+
+# One split as it appears in rawlist.txt, with the reveal effect already normalized
+Split = namedtuple('Split', ['card_def_id', 'surface_effect_def_id', 'reveal_effect_def_id', 'time_created'])
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+EPOCH_DATE = EPOCH.date()
+MICROSECONDS_PER_DAY = 86400 * 1000000
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# Stored in place of TimeCreated when it is missing or unreadable, sorts first like an empty string did
+MISSING_TIME = -(1 << 63)
+
+# Microseconds since midnight for every HH:MM, used by the fixed-format TimeCreated parser
+MINUTE_OFFSETS = {f"{hour:02d}:{minute:02d}": (hour * 60 + minute) * 60 * 1000000 for hour in range(24) for minute in range(60)}
+
+@lru_cache(maxsize=None)
+def day_start(date_str):
+    """Epoch microseconds at midnight UTC of a YYYY-MM-DD date, raising ValueError if it isn't one."""
+    if date_str[4] != '-' or date_str[7] != '-' or not (date_str.isascii() and date_str.replace('-', '').isdigit()):
+        raise ValueError(f"Invalid date: {date_str!r}")
+    day = date(int(date_str[:4]), int(date_str[5:7]), int(date_str[8:10]))
+    return (day - EPOCH_DATE).days * MICROSECONDS_PER_DAY
+
+@lru_cache(maxsize=None)
+def format_day(days):
+    """The YYYY-MM-DD date a number of days after the epoch."""
+    return f"{EPOCH_DATE + timedelta(days=days):%Y-%m-%d}"
+
+def parse_time_created(time_created):
+    """Convert a TimeCreated string to epoch microseconds, or MISSING_TIME if it can't be read.
+
+    The game always writes the fixed YYYY-MM-DDTHH:MM:SS.mmmZ layout, which
+    is read by slicing with the date and HH:MM parts looked up in caches.
+    Anything else falls back to the general ISO 8601 parser.
+    """
+    if len(time_created) == 24 and time_created[10] == 'T' and time_created[16] == ':' \
+            and time_created[19] == '.' and time_created[23] == 'Z':
+        minute = MINUTE_OFFSETS.get(time_created[11:16])
+        milliseconds = time_created[17:19] + time_created[20:23]
+        if minute is not None and milliseconds.isascii() and milliseconds.isdigit() and int(milliseconds) < 60000:
+            try:
+                return day_start(time_created[:10]) + minute + int(milliseconds) * 1000
+            except ValueError:
+                return MISSING_TIME
 
-def extract_cards_section(file_path):
-    with open(file_path, 'r', encoding='utf-8-sig') as file:
-        json_content = file.read()
+    try:
+        timestamp = datetime.fromisoformat(time_created.replace('Z', '+00:00'))
+    except ValueError:
+        return MISSING_TIME
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - EPOCH) // ONE_MICROSECOND
+
+def format_time_created(epoch_us):
+    """Convert epoch microseconds back to the TimeCreated format, e.g. 2023-02-16T03:24:41.045Z
 
-    # Regular expression to find the "Cards": [ section that follows a closing square bracket
-    pattern = re.compile(r'\],\s*"Cards":\s*\[([^]]*)\]', re.DOTALL)
-    match = pattern.search(json_content)
+    Times with sub-millisecond precision keep all six fractional digits.
+    """
+    if epoch_us == MISSING_TIME:
+        return ''
+    days, microseconds = divmod(epoch_us, MICROSECONDS_PER_DAY)
+    seconds, microseconds = divmod(microseconds, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    milliseconds, remainder = divmod(microseconds, 1000)
+    fraction = f"{microseconds:06d}" if remainder else f"{milliseconds:03d}"
+    return f"{format_day(days)}T{hours:02d}:{minutes:02d}:{seconds:02d}.{fraction}Z"
+
+class StringPool:
+    """Interns strings into small integer codes that can be shared between tables."""
+
+    def __init__(self):
+        self.codes = {}
+        self.strings = []
+
+    def intern(self, string):
+        code = self.codes.get(string)
+        if code is None:
+            code = self.codes[string] = len(self.strings)
+            self.strings.append(string)
+        return code
+
+class SplitTable:
+    """Columnar store of splits.
+
+    CardDefId, SurfaceEffectDefId and the normalized reveal effect are kept
+    as codes from a StringPool and TimeCreated as epoch microseconds, each in
+    its own typed array. Iterating the table yields Split records.
+    time_sources holds, by position, the few TimeCreated strings that
+    format_time_created wouldn't give back as they were read.
+    """
 
-    if match:
-        cards_section = match.group(1)
+    COLUMNS = ('card_codes', 'surface_codes', 'reveal_codes', 'times')
+
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else StringPool()
+        self.card_codes = array('I')
+        self.surface_codes = array('I')
+        self.reveal_codes = array('I')
+        self.times = array('q')
+        self.time_sources = {}
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        strings = self.pool.strings
+        times = map(format_time_created, self.times)
+        if self.time_sources:
+            times = (self.time_sources.get(position, time_created) for position, time_created in enumerate(times))
+        for card_code, surface_code, reveal_code, time_created in zip(self.card_codes, self.surface_codes, self.reveal_codes, times):
+            yield Split(strings[card_code], strings[surface_code], strings[reveal_code], time_created)
+
+    def time_created(self, position):
+        """The TimeCreated of one split, as it was read."""
+        return self.time_sources.get(position) or format_time_created(self.times[position])
+
+    @classmethod
+    def from_records(cls, splits):
+        """Build a table from Split records, e.g. read back from rawlist.txt, in their existing order."""
+        table = cls()
+        for split in splits:
+            table.append(split[0], split[1], split[2], parse_time_created(split[3]), split[3])
+        return table
+
+    def append(self, card_def_id, surface_effect_def_id, reveal_effect_def_id, epoch_us, time_created=None):
+        """Add a split. Given the TimeCreated that epoch_us was parsed from, it is kept if it wouldn't round-trip."""
+        intern = self.pool.intern
+        self.card_codes.append(intern(card_def_id))
+        self.surface_codes.append(intern(surface_effect_def_id))
+        self.reveal_codes.append(intern(reveal_effect_def_id))
+        self.times.append(epoch_us)
+        # A time in the fixed layout parse_time_created reads by slicing always comes back unchanged
+        if time_created is not None and (epoch_us == MISSING_TIME or not (
+                len(time_created) == 24 and time_created[10] == 'T' and time_created[16] == ':'
+                and time_created[19] == '.' and time_created[23] == 'Z')) and format_time_created(epoch_us) != time_created:
+            self.time_sources[len(self.times) - 1] = time_created
+
+    def is_sorted_by_time(self):
+        times = self.times
+        return not any(map(operator.gt, times, islice(times, 1, None)))
+
+    def sort_by_time(self):
+        """Reorder every column by TimeCreated, keeping ties in their original order.
+
+        Collections are usually already chronological, which is checked in one
+        pass before anything is moved. Otherwise the sort merges the sorted
+        runs already in the data, so nearly sorted input costs close to a
+        single pass too.
+        """
+        if self.is_sorted_by_time():
+            return
+        order = sorted(range(len(self.times)), key=self.times.__getitem__)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            setattr(self, name, array(column.typecode, [column[i] for i in order]))
+        if self.time_sources:
+            sources = self.time_sources
+            self.time_sources = {position: sources[i] for position, i in enumerate(order) if i in sources}
+
+class StageMetrics:
+    """Wall time, CPU time, peak memory and record counts for each pipeline stage.
+
+    Stages are timed with the stage() context manager and can nest. CPU time
+    is that of the thread running the stage. Peak memory is only sampled,
+    with tracemalloc, when trace_memory is set, since tracing slows the run.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.stages = {}
+        self.counts = {}
+        self.trace_memory = trace_memory
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        open_stages = self.local.__dict__.setdefault('open_stages', [])
+        frame = {'peak': 0}
+        if self.trace_memory:
+            # Resetting the peak would lose it for the enclosing stages, so hand it to them first
+            peak = tracemalloc.get_traced_memory()[1]
+            for outer in open_stages:
+                outer['peak'] = max(outer['peak'], peak)
+            tracemalloc.reset_peak()
+        open_stages.append(frame)
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
         try:
-            cards_data = json.loads(f"[{cards_section.strip()}]")
-            return cards_data
-        except json.JSONDecodeError as e:
-            print(f"Error decoding JSON: {e}")
-            return None
-    else:
-        print("No matching section found")
-        return None
+            yield
+        finally:
+            open_stages.pop()
+            self.add_time(name, time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+            if self.trace_memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record = self.stages[name]
+                record['peak_bytes'] = max(record.get('peak_bytes', 0), peak)
+                for outer in open_stages:
+                    outer['peak'] = max(outer['peak'], peak)
+
+    def add_time(self, name, wall_seconds, cpu_seconds):
+        record = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+        record['wall_seconds'] += wall_seconds
+        record['cpu_seconds'] += cpu_seconds
+        record['calls'] += 1
+
+    def count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def to_dict(self):
+        return {'stages': self.stages, 'counts': self.counts}
+
+    def merge(self, other):
+        """Add the stages and counts from another StageMetrics.to_dict()."""
+        for name, record in other['stages'].items():
+            own = self.stages.setdefault(name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'calls': 0})
+            for key, value in record.items():
+                own[key] = max(own.get(key, 0), value) if key == 'peak_bytes' else own.get(key, 0) + value
+        for name, value in other['counts'].items():
+            self.count(name, value)
+
+class NullMetrics:
+    """Stands in for StageMetrics when metrics are off, doing nothing."""
+
+    enabled = False
+
+    def stage(self, name):
+        return contextlib.nullcontext()
+
+    def add_time(self, name, wall_seconds, cpu_seconds):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+# Metrics for the current run, replaced by start_metrics()
+METRICS = NullMetrics()
+
+def start_metrics(trace_memory=False):
+    """Start collecting stage metrics for the rest of the run and return the collector."""
+    global METRICS
+    METRICS = StageMetrics(trace_memory)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return METRICS
+
+def write_metrics(metrics, output_file):
+    """Save collected metrics as JSON."""
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(metrics.to_dict(), file, indent=2)
+    print(f"Metrics written to {output_file}")
 
-def process_collection_state(file_path):
-    """Process the JSON file and output a simplified list of information."""
+def extract_cards_section(file_path, chunk_size=READ_CHUNK_SIZE):
+    """Yield the entries of the collection's "Cards" array one at a time.
+
+    The file is read in chunks, so memory use stays flat however large the
+    collection is. The array used is the first "Cards" key reached only
+    through objects, which skips the card lists stored inside each deck.
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        buffer = ''
+        pos = 0
+        containers = []
+
+        def read_more():
+            # Keep the unconsumed tail and append the next chunk
+            nonlocal buffer, pos
+            if METRICS.enabled:
+                wall_start = time.perf_counter()
+                cpu_start = time.thread_time()
+                chunk = file.read(chunk_size)
+                METRICS.add_time('read_file', time.perf_counter() - wall_start, time.thread_time() - cpu_start)
+            else:
+                chunk = file.read(chunk_size)
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return bool(chunk)
+
+        # Find the "Cards" key, tracking which containers we are inside
+        while True:
+            match = SCAN_TOKEN_PATTERN.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                if not read_more():
+                    raise ValueError("No matching section found")
+                continue
+
+            pos = match.start()
+            token = match.group()
+            if token in '{[':
+                containers.append(token)
+                pos += 1
+            elif token in '}]':
+                if containers:
+                    containers.pop()
+                pos += 1
+            else:
+                string_end = STRING_BODY_PATTERN.match(buffer, pos + 1)
+                if string_end is None:
+                    if not read_more():
+                        raise ValueError("No matching section found")
+                    continue
+
+                if buffer[pos + 1:string_end.end() - 1] == 'Cards' and '[' not in containers:
+                    array_open = ARRAY_OPEN_PATTERN.match(buffer, string_end.end())
+                    if array_open is not None:
+                        pos = array_open.end()
+                        break
+                    # The ': [' may be split across two chunks
+                    if PARTIAL_ARRAY_OPEN_PATTERN.fullmatch(buffer, string_end.end()):
+                        if read_more():
+                            continue
+                pos = string_end.end()
+
+        # Decode the array entries one object at a time
+        while True:
+            pos = ELEMENT_SEPARATOR_PATTERN.match(buffer, pos).end()
+            if pos == len(buffer):
+                if not read_more():
+                    raise json.JSONDecodeError("Unterminated Cards section", buffer, pos)
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                card, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Read on only if the entry may continue in the next chunk: the error is at the end
+                # of the buffer, a string runs to the end, or only an unfinished token follows it
+                if not (e.msg.startswith('Unterminated string') or UNFINISHED_TOKEN_PATTERN.fullmatch(buffer, e.pos)):
+                    raise
+                if not read_more():
+                    raise
+                continue
+
+            yield card
+            pos = end
+
+def add_collection_cards(table, cards):
+    """Append the splits among a "Cards" array's entries to a SplitTable, in their existing order.
+
+    Custom cards are skipped and reveal effects normalized. Returns the
+    number of entries, the number of custom cards and the
+    (CardDefId, TimeCreated) of every split whose time couldn't be read.
+    Raises ValueError on an entry that isn't an object or whose fields,
+    when present, aren't strings.
+    """
+    total_cards = 0
+    custom_cards = 0
+    bad_times = []
+    for card in cards:
+        total_cards += 1
+        if not isinstance(card, dict):
+            raise ValueError(f"Cards entry {total_cards} is not an object")
+        if "Custom" in card and card["Custom"]:
+            custom_cards += 1
+            continue  # Skip entries where Custom is true
+
+        card_def_id = card.get('CardDefId') or ''
+        surface_effect_def_id = card.get('SurfaceEffectDefId') or ''
+        reveal_effect_def_id = card.get('CardRevealEffectDefId') or ''
+        time_created = card.get('TimeCreated') or ''
+        if not all(isinstance(value, str) for value in (card_def_id, surface_effect_def_id, reveal_effect_def_id, time_created)):
+            raise ValueError(f"Cards entry {total_cards} has a CardDefId, SurfaceEffectDefId, CardRevealEffectDefId "
+                             "or TimeCreated that isn't a string")
+
+        if card_def_id and surface_effect_def_id:
+            reveal_effect = normalize_reveal_effect(reveal_effect_def_id)
+            epoch_us = parse_time_created(time_created)
+            if epoch_us == MISSING_TIME:
+                bad_times.append((card_def_id, time_created))
+            table.append(card_def_id, surface_effect_def_id, reveal_effect, epoch_us, time_created)
+    return total_cards, custom_cards, bad_times
+
+def process_collection_state(file_path, summary=None):
+    """Process the JSON file into a chronological SplitTable.
+
+    Returns None if the file could not be read. The counts reported with
+    report_collection are also stored in the summary dict when one is given.
+    """
+    cards_info = SplitTable()
     try:
-        data = extract_cards_section(file_path)
-        if data is None:
-            return False
+        total_cards, custom_cards, bad_times = add_collection_cards(cards_info, extract_cards_section(file_path))
     except FileNotFoundError:
         print(f"Error: FileNotFoundError - CollectionState.json file not found at {file_path}")
-        return False
+        return None
     except json.JSONDecodeError as e:
         print(f"Error: JSONDecodeError - {e}")
+        return None
+    except ValueError as e:
+        print(e)
+        return None
+
+    counts = {
+        'cards': total_cards,
+        'custom_cards': custom_cards,
+        'splits': len(cards_info),
+        'bad_times': len(bad_times),
+        'first_bad_time': list(bad_times[0]) if bad_times else None,
+    }
+    report_collection(counts)
+    if summary is not None:
+        summary.update(counts)
+
+    # Sort the cards by TimeCreated
+    with METRICS.stage('sort_by_time'):
+        cards_info.sort_by_time()
+    return cards_info
+
+def report_collection(counts):
+    """Count a collection's cards and splits in METRICS and warn about unreadable times."""
+    for name in ('cards', 'custom_cards', 'splits', 'bad_times'):
+        METRICS.count(name, counts[name])
+    if counts['bad_times']:
+        card_def_id, time_created = counts['first_bad_time']
+        print(f"Warning: {counts['bad_times']} splits have a missing or malformed TimeCreated (first: {card_def_id} {time_created!r}), "
+              "they are counted but listed first")
+
+def document_cards(document):
+    """Return the "Cards" array of a parsed CollectionState document, or the document itself if it is one.
+
+    Like extract_cards_section, the first "Cards" key reached only through
+    objects is used. Returns None when there is no such array.
+    """
+    if isinstance(document, list):
+        return document
+    if not isinstance(document, dict):
+        return None
+    for key, value in document.items():
+        if key == 'Cards' and isinstance(value, list):
+            return value
+        if isinstance(value, dict):
+            cards = document_cards(value)
+            if cards is not None:
+                return cards
+    return None
+
+def ingest_ndjson(file_path, malformed=None):
+    """Yield (line number, chronological SplitTable) for every submission in a newline-delimited dump.
+
+    Every line holds one CollectionState document or bare "Cards" array,
+    normalized exactly like process_collection_state. Lines are read and
+    decoded one at a time, so only one document is ever held in memory.
+    Blank lines are ignored. Malformed ones are skipped, counted as
+    'malformed_lines' in METRICS and their line numbers appended to the
+    malformed list when one is given.
+    """
+    with open(file_path, 'rb') as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                cards = document_cards(json.loads(line))
+                if cards is None:
+                    raise ValueError("no Cards array")
+                table = SplitTable()
+                total_cards, custom_cards, bad_times = add_collection_cards(table, cards)
+            except (ValueError, AttributeError, TypeError) as e:
+                print(f"Warning: skipping malformed line {line_number} of {file_path}: {str(e)[:200]}")
+                METRICS.count('malformed_lines')
+                if malformed is not None:
+                    malformed.append(line_number)
+                continue
+
+            METRICS.count('documents')
+            METRICS.count('cards', total_cards)
+            METRICS.count('custom_cards', custom_cards)
+            METRICS.count('splits', len(table))
+            METRICS.count('bad_times', len(bad_times))
+            table.sort_by_time()
+            yield line_number, table
+
+def write_rawlist(splits, output_file=RAWLIST_PATH):
+    """Export the splits to rawlist.txt, one space separated split per line."""
+    try:
+        with open(output_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(f"{split[0]} {split[1]} {split[2]} {split[3]}\n" for split in splits)
+
+        print(f"Output written to {output_file}")
+        return True
+    except IOError as e:
+        print(f"Error: IOError - {e}")
         return False
 
-    # Extract relevant information and filter out entries with "Custom": true
-    cards_info = []
-    for card in data:
-        if "Custom" in card and card["Custom"]:
-            continue  # Skip entries where Custom is true
+def file_digest(file_path):
+    """Return the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def replace_file(path, data):
+    """Write data to path atomically, so concurrent readers never see a partial file."""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+def write_split_cache(table, entry_path, summary=None):
+    """Save a SplitTable in the cache format, with the process_collection_state summary of its file.
+
+    The file is the magic bytes, the header length, a JSON header holding the
+    string pool, split count, column layout, time_sources and summary, then each column's raw array
+    bytes at an 8 byte aligned offset, so the columns can be memory-mapped as
+    they are.
+    """
+    columns = {}
+    offset = 0
+    for name in SplitTable.COLUMNS:
+        column = getattr(table, name)
+        nbytes = len(column) * column.itemsize
+        columns[name] = [column.typecode, column.itemsize, offset, nbytes]
+        offset += -(-nbytes // 8) * 8
+    header = json.dumps({
+        'version': CACHE_FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'strings': table.pool.strings,
+        'splits': len(table),
+        'columns': columns,
+        'time_sources': list(table.time_sources.items()),
+        'summary': summary,
+    }).encode('utf-8')
+    header += b' ' * (-(len(CACHE_MAGIC) + 8 + len(header)) % 8)
+
+    data = bytearray(CACHE_MAGIC + struct.pack('<Q', len(header)) + header)
+    for name in SplitTable.COLUMNS:
+        column = getattr(table, name)
+        data += column.tobytes()
+        data += bytes(-len(data) % 8)
+    replace_file(entry_path, data)
+
+def read_split_cache(entry_path, summary=None):
+    """Load a SplitTable saved by write_split_cache, or None if it is missing or unusable.
+
+    A truncated or partly written entry, or one whose columns don't all
+    hold the header's split count, counts as unusable. The saved summary is
+    copied into the summary dict when one is given.
+    """
+    try:
+        with open(entry_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if view[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                return None
+            header_start = len(CACHE_MAGIC) + 8
+            header_size, = struct.unpack_from('<Q', view, len(CACHE_MAGIC))
+            header = json.loads(view[header_start:header_start + header_size])
+            if header['version'] != CACHE_FORMAT_VERSION:
+                return None
+
+            table = SplitTable()
+            table.pool.strings = header['strings']
+            table.pool.codes = {string: code for code, string in enumerate(header['strings'])}
+            data_start = header_start + header_size
+            splits = header['splits']
+            with memoryview(view) as buffer:
+                for name in SplitTable.COLUMNS:
+                    typecode, itemsize, offset, nbytes = header['columns'][name]
+                    column = array(typecode)
+                    start = data_start + offset
+                    if column.itemsize != itemsize or nbytes != splits * itemsize or start + nbytes > len(view):
+                        return None
+                    column.frombytes(buffer[start:start + nbytes])
+                    if header['byteorder'] != sys.byteorder:
+                        column.byteswap()
+                    setattr(table, name, column)
+            table.time_sources = {position: time_created for position, time_created in header['time_sources']}
+            if summary is not None:
+                summary.update(header['summary'] or {})
+            return table
+    except (OSError, ValueError, KeyError, TypeError, struct.error):
+        return None
 
-        card_def_id = card.get('CardDefId', '')
-        surface_effect_def_id = card.get('SurfaceEffectDefId', '')
-        reveal_effect_def_id = card.get('CardRevealEffectDefId', '')
-        time_created = card.get('TimeCreated', '')
+def evict_split_cache(cache_dir, max_bytes, keep=()):
+    """Delete the least recently used cache files, entries and stat files alike, until the cache fits in max_bytes."""
+    entries = []
+    paths = glob.glob(os.path.join(cache_dir, f"*.{CACHE_ENTRY_SUFFIX}")) + glob.glob(os.path.join(cache_dir, f"*.{CACHE_STAT_SUFFIX}"))
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Evicted by another process
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def load_collection(file_path, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES):
+    """process_collection_state, optionally backed by a content-addressed cache in cache_dir.
+
+    Entries are keyed by the SHA-256 of the file, and the file's size and
+    modification time are remembered so an unchanged file isn't even hashed.
+    A hit skips the JSON decoding and reveal effect normalization, but
+    reports the same counts and warnings as the parse did. The cache, stat
+    files included, is kept under cache_max_bytes by evicting the least
+    recently used files. If the cache can't be written, e.g. a read-only or full disk,
+    the collection is still parsed and returned, just not cached.
+    """
+    if cache_dir is None:
+        return process_collection_state(file_path)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return process_collection_state(file_path)  # Reports the missing file as usual
 
-        if card_def_id and surface_effect_def_id:
-            reveal_effect = reveal_effect_def_id
-            if reveal_effect_def_id:
-                # Check if the reveal effect is one of the known colors
-                if any(color in reveal_effect_def_id for color in ["Black", "Gold", "Green", "Blue", "Red", "White", "Purple"]):
-                    reveal_effect = f"{reveal_effect_def_id}"
-                else:
-                    # Append "Rainbow" to specific card types
-                    if reveal_effect_def_id in ["Comic", "Glimmer", "Kirby", "Sparkle"]:
-                        reveal_effect = f"{reveal_effect_def_id}Rainbow"
-                    else:
-                        reveal_effect = "Rainbow"
-            cards_info.append((card_def_id, surface_effect_def_id, reveal_effect, time_created))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError as e:
+        print(f"Not caching: {e}")
+        return process_collection_state(file_path)
+    path_key = hashlib.sha256(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+    stat_path = os.path.join(cache_dir, f"{path_key}.{CACHE_STAT_SUFFIX}")
+
+    # Fast path: the file is unchanged since it was last hashed
+    digest = None
+    try:
+        with open(stat_path, 'r', encoding='utf-8') as file:
+            known = json.load(file)
+        if known['mtime_ns'] == stat.st_mtime_ns and known['size'] == stat.st_size:
+            digest = known['digest']
+            os.utime(stat_path)  # Mark as recently used
+    except (OSError, ValueError, KeyError):
+        pass
+    if digest is None:
+        digest = file_digest(file_path)
+        known = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+        try:
+            replace_file(stat_path, json.dumps(known).encode('utf-8'))
+        except OSError:
+            pass  # Hashed again next time
+
+    entry_path = os.path.join(cache_dir, f"{digest}.{CACHE_ENTRY_SUFFIX}")
+    summary = {}
+    table = read_split_cache(entry_path, summary)
+    if table is not None and summary:
+        METRICS.count('cache_hits')
+        report_collection(summary)
+        try:
+            os.utime(entry_path)  # Mark as recently used
+        except OSError:
+            pass
+        return table
 
-    # Sort the cards by TimeCreated
-    cards_info.sort(key=lambda x: x[3])
+    table = process_collection_state(file_path, summary)
+    if table is not None:
+        try:
+            write_split_cache(table, entry_path, summary)
+            evict_split_cache(cache_dir, cache_max_bytes, keep=(entry_path, stat_path))
+        except OSError as e:
+            print(f"Not caching: {e}")
+    return table
+
+# Flare colors counted for the summary, in display order before sorting
+FLARE_COLORS = ["Black", "Gold", "Green", "Blue", "Red", "White", "Purple", "Rainbow"]
+
+# Flag names in bit order, as published in the flags column and flag_bits of split
+# exports. Existing entries are never renamed or reordered: the flag of a rule
+# that isn't listed yet is appended at the end.
+FLAG_NAMES = ["Foil", "Prism", "Ink", "GoldFoil", "Gold", "Comic", "Glimmer", "Sparkle", "Kirby"]
+FLAG_NAMES += [f"{color}Flare" for color in FLARE_COLORS]
+
+# Where an effect shows up: the SurfaceEffectDefId or the normalized reveal effect
+SURFACE = 'surface'
+REVEAL = 'reveal'
+
+# The eligibility rules every statistic follows. Each effect a split can roll,
+# the field it shows up in, the substring that field must contain and the
+# substrings it must not, the first split number of a card that can roll it,
+# and the SplitStatistics counters for its hits and for the splits that could
+# roll it. Effects sharing a rolls counter count a split once. The split tier
+# breakdown lists an effect from its first split unless listed_from is given.
+# A rule's flag is the FLAG_NAMES entry named flag_name, or its own name.
+EffectRule = namedtuple('EffectRule', ['name', 'field', 'match', 'exclude', 'first_split', 'hits', 'rolls',
+                                       'listed_from', 'flag_name', 'flag'], defaults=(None, None, None))
+EFFECT_RULES = [
+    EffectRule("Foil", SURFACE, "Foil", ("PrismFoil", "GoldFoil"), 1, 'foil_hits', None),
+    EffectRule("Prism", SURFACE, "PrismFoil", (), 1, 'prism_hits', None),
+    EffectRule("Ink", SURFACE, "Ink", (), 4, 'ink_hits', 'ink_rolls'),
+    EffectRule("Gold", SURFACE, "GoldFoil", (), 5, 'gold_hits', 'gold_rolls', flag_name="GoldFoil"),
+    EffectRule("Comic", REVEAL, "Comic", (), 2, 'comic_hits', 'comic_glimmer_rolls'),
+    EffectRule("Glimmer", REVEAL, "Glimmer", (), 2, 'glimmer_hits', 'comic_glimmer_rolls'),
+    EffectRule("Sparkle", REVEAL, "Sparkle", (), 5, 'sparkle_hits', 'gold_rolls', listed_from=4),
+    EffectRule("Kirby", REVEAL, "Kirby", (), 6, 'kirby_hits', 'kirby_rolls'),
+]
+FLAG_NAMES += [rule.name for rule in EFFECT_RULES if (rule.flag_name or rule.name) not in FLAG_NAMES]
+FLAG_BITS = {name: 1 << index for index, name in enumerate(FLAG_NAMES)}
+EFFECT_RULES = [rule._replace(listed_from=rule.listed_from or rule.first_split, flag_name=rule.flag_name or rule.name,
+                              flag=FLAG_BITS[rule.flag_name or rule.name]) for rule in EFFECT_RULES]
+RULES_BY_NAME = {rule.name: rule for rule in EFFECT_RULES}
+
+# Flag for each effect rule by name
+EFFECT_FLAGS = {rule.name: rule.flag for rule in EFFECT_RULES}
+
+# Flags beyond the rules: any gold background, as luck, droughts and streaks count it, and every flare color
+GOLD = FLAG_BITS["Gold"]
+COLOR_FLAGS = {color: FLAG_BITS[f"{color}Flare"] for color in FLARE_COLORS}
+ANY_COLOR = sum(COLOR_FLAGS.values())
+
+# How every flag is matched: (flag, field, substring, excluded substrings)
+FLAG_MATCHES = [(rule.flag, rule.field, rule.match, rule.exclude) for rule in EFFECT_RULES]
+FLAG_MATCHES += [(GOLD, SURFACE, "Gold", ())] + [(flag, REVEAL, color, ()) for color, flag in COLOR_FLAGS.items()]
+BACKGROUND_FLAGS = sum(flag for flag, field, _, _ in FLAG_MATCHES if field == SURFACE)
+
+# Reveal effects that are a flare family, spelled out as <family>Rainbow when uncolored
+FLARE_FAMILIES = {rule.match for rule in EFFECT_RULES if rule.field == REVEAL}
+
+# Flags the summary's hit counters over every split look at
+INK, GOLD_FOIL, KIRBY = EFFECT_FLAGS["Ink"], EFFECT_FLAGS["Gold"], EFFECT_FLAGS["Kirby"]
+
+# Order statistics.txt lists the effects of a split tier in, independent of the
+# rule order. Rules not named here follow in rule order.
+SPLIT_TIER_ORDER = ["Foil", "Prism", "Ink", "Gold", "Glimmer", "Comic", "Sparkle", "Kirby"]
+TIER_RULES = sorted(EFFECT_RULES, key=lambda rule: SPLIT_TIER_ORDER.index(rule.name) if rule.name in SPLIT_TIER_ORDER else len(SPLIT_TIER_ORDER))
+
+# Split tiers broken down in statistics.txt: label, split numbers covered and
+# the effects reported, every rule listed from its listed_from split on
+SPLIT_TIERS = [(label, split_numbers, [rule.name for rule in TIER_RULES if rule.listed_from <= min(split_numbers)])
+               for label, split_numbers in [("2-3", (2, 3)), ("4", (4,)), ("5", (5,)), ("6", (6,))]]
+
+# From this split number on, every effect can be rolled
+LAST_FIRST_SPLIT = max(rule.first_split for rule in EFFECT_RULES)
+
+# Effects followed by the luck score, droughts and streaks, where Gold is any gold background
+HISTORY_EFFECTS = [("Ink", EFFECT_FLAGS["Ink"]), ("Gold", GOLD), ("Kirby", EFFECT_FLAGS["Kirby"])]
+
+# Luck score: points for every split that could roll an effect, for every hit, and for two hits on one split
+LUCK_ROLL_POINTS = {"Ink": -1, "Kirby": -1}
+LUCK_HIT_POINTS = {"Ink": 5, "Gold": 5, "Kirby": 5}
+LUCK_PAIR_POINTS = {("Kirby", "Ink"): 5, ("Kirby", "Gold"): 5}
+
+# Per card drought keys and streak names, in report order
+DROUGHT_KEYS = [key for name, _ in HISTORY_EFFECTS for key in (f"{name} Drought", f"Max {name} Drought")]
+STREAK_KEYS = [(name.lower(), f"highest_{name.lower()}_streak", flag) for name, flag in HISTORY_EFFECTS]
+
+# Counters kept as prefix sums by the time index, named as in SplitStatistics:
+# (lowest split number that counts, flag the split must have or None)
+TIME_SERIES = {}
+for rule in EFFECT_RULES:
+    if rule.rolls is not None:
+        TIME_SERIES.setdefault(rule.rolls, (rule.first_split, None))
+    TIME_SERIES[rule.hits] = (rule.first_split, rule.flag)
+
+# Effects counted per card for the card table, in column order, and the flag
+# each counts. Ink, Gold and Kirby count the flags of their droughts, so a
+# card's gold hits and gold drought both go by any gold background.
+CARD_HIT_EFFECTS = ["Ink", "Gold", "Kirby", "Sparkle", "Comic", "Glimmer", "Prism"]
+CARD_HIT_FLAGS = {effect: dict(HISTORY_EFFECTS).get(effect, EFFECT_FLAGS[effect]) for effect in CARD_HIT_EFFECTS}
+
+# Columns of a split export as (name, type, nullable), ending with one bool per effect rule.
+# A split without a reveal effect, or whose TimeCreated couldn't be read, has a null there.
+EXPORT_COLUMNS = [('card_def_id', 'string', False), ('surface_effect_def_id', 'string', False),
+                  ('reveal_effect_def_id', 'string', True), ('time_created', 'timestamp[us, UTC]', True),
+                  ('split_number', 'int32', False), ('flags', 'int32', False)]
+EXPORT_COLUMNS += [(rule.name.lower(), 'bool', False) for rule in EFFECT_RULES]
+
+# Simulated splits generated at a time, bounding the simulation's memory use
+SIMULATION_CHUNK_CELLS = 1 << 21
+
+# Rates shown for every month in the trends section: (label, hits, rolls)
+TREND_RATES = [("Ink", 'ink_hits', 'ink_rolls'), ("Gold", 'gold_hits', 'gold_rolls'),
+               ("Sparkle", 'sparkle_hits', 'gold_rolls'), ("Kirby", 'kirby_hits', 'kirby_rolls')]
+
+@lru_cache(maxsize=None)
+def normalize_reveal_effect(reveal_effect_def_id):
+    """Return the CardRevealEffectDefId as rawlist.txt shows it, with Rainbow spelled out."""
+    if not reveal_effect_def_id:
+        return reveal_effect_def_id
+    # Check if the reveal effect is one of the known colors
+    if any(color in reveal_effect_def_id for color in FLARE_COLORS if color != "Rainbow"):
+        return reveal_effect_def_id
+    # Append "Rainbow" to the flare families
+    if reveal_effect_def_id in FLARE_FAMILIES:
+        return f"{reveal_effect_def_id}Rainbow"
+    return "Rainbow"
+
+def field_mask(field, value):
+    """Return the flags FLAG_MATCHES gives a value of one field."""
+    mask = 0
+    for flag, match_field, match, exclude in FLAG_MATCHES:
+        if match_field == field and match in value and not any(excluded in value for excluded in exclude):
+            mask |= flag
+    return mask
+
+@lru_cache(maxsize=None)
+def surface_effect_mask(surface_effect_def_id):
+    """Return the background flags for a SurfaceEffectDefId."""
+    return field_mask(SURFACE, surface_effect_def_id)
+
+@lru_cache(maxsize=None)
+def reveal_effect_mask(reveal_effect_def_id):
+    """Return the flare family and color flags for a normalized reveal effect."""
+    return field_mask(REVEAL, reveal_effect_def_id)
+
+@lru_cache(maxsize=None)
+def split_outcome(split_number, mask):
+    """Apply the rule tables to one split, given its number for its card and its effect flags.
+
+    Returns the SplitStatistics counters it adds one to, its luck points,
+    its (effect, hit) drought updates and the CARD_HIT_EFFECTS it hit on a
+    split that could roll them. Every split past LAST_FIRST_SPLIT
+    has the same outcome, so callers pass min(split_number, LAST_FIRST_SPLIT)
+    and the few distinct outcomes are computed once, however many rules
+    there are.
+    """
+    counters = []
+    for rule in EFFECT_RULES:
+        if split_number >= rule.first_split:
+            if rule.rolls is not None and rule.rolls not in counters:
+                counters.append(rule.rolls)
+            if mask & rule.flag:
+                counters.append(rule.hits)
+
+    hits = {name: bool(mask & flag) for name, flag in HISTORY_EFFECTS}
+    luck = sum(points for name, points in LUCK_ROLL_POINTS.items() if split_number >= RULES_BY_NAME[name].first_split)
+    luck += sum(points for name, points in LUCK_HIT_POINTS.items() if hits[name])
+    luck += sum(points for (first, second), points in LUCK_PAIR_POINTS.items() if hits[first] and hits[second])
+    droughts = tuple((name, hits[name]) for name, _ in HISTORY_EFFECTS if split_number >= RULES_BY_NAME[name].first_split)
+    card_hits = tuple(effect for effect in CARD_HIT_EFFECTS
+                      if mask & CARD_HIT_FLAGS[effect] and split_number >= RULES_BY_NAME[effect].first_split)
+    return tuple(counters), luck, droughts, card_hits
+
+class TopK:
+    """The k highest (or with lowest, lowest) scored entries offered, in a heap of at most k entries.
+
+    Offering n entries costs O(n log k) time and O(k) memory. Ties rank
+    the entry offered first higher, like max and min and stable sorts do,
+    and a merged TopK ranks its own entries before the other's, so merging
+    gives the same result as offering everything to one TopK.
+    """
+
+    def __init__(self, k, lowest=False):
+        self.k = k
+        self.lowest = lowest
+        self.offered = 0
+        self.heap = []  # (signed score, -offer order, entry), worst at heap[0]
+
+    def _key(self, score, order):
+        return (-score if self.lowest else score, -order)
+
+    def accepts(self, score):
+        """Whether an entry with this score would be kept if offered now."""
+        return len(self.heap) < self.k or self._key(score, self.offered) > self.heap[0][:2]
+
+    def offer(self, score, entry):
+        self._push(self._key(score, self.offered), entry)
+        self.offered += 1
+
+    def _push(self, key, entry):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, key + (entry,))
+        elif key > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, key + (entry,))
+
+    def merge(self, other):
+        """Fold another TopK's entries in as if offered after everything offered so far, and return self."""
+        for signed_score, negative_order, entry in other.heap:
+            self._push((signed_score, negative_order - self.offered), entry)
+        self.offered += other.offered
+        return self
+
+    def items(self):
+        """(score, entry) pairs, best first."""
+        ranked = sorted(self.heap, reverse=True)
+        return [(-signed_score if self.lowest else signed_score, entry) for signed_score, _, entry in ranked]
+
+    def to_dict(self):
+        return {'k': self.k, 'lowest': self.lowest, 'offered': self.offered, 'heap': [list(item) for item in self.heap]}
+
+    @classmethod
+    def from_dict(cls, state):
+        top = cls(state['k'], state['lowest'])
+        top.offered = state['offered']
+        top.heap = [tuple(item) for item in state['heap']]
+        heapq.heapify(top.heap)
+        return top
+
+class SplitStatistics:
+    """Every statistic in the reports, accumulated in a single pass over the splits.
+
+    Splits must be added in chronological order. Both statistics.txt and
+    summary.html are rendered from the counters kept here.
+    """
+
+    def __init__(self):
+        self.total_splits = 0
+        self.card_counts = {}
+
+        # Background and flare hits against the splits that could roll them, one pair per EFFECT_RULES entry
+        for rule in EFFECT_RULES:
+            if rule.rolls is not None:
+                setattr(self, rule.rolls, 0)
+            setattr(self, rule.hits, 0)
+
+        # Hits on every split regardless of eligibility, as shown in the summary
+        self.all_ink_hits = 0
+        self.all_gold_hits = 0
+        self.all_kirby_hits = 0
+        self.ink_kirby_hits = 0
+        self.gold_kirby_hits = 0
+        self.color_counts = {color: 0 for color in FLARE_COLORS}
+
+        # Split tier label -> effect -> count, with the tier size under "Total"
+        self.split_tiers = {}
+        self.tier_by_split = {}
+        for label, split_numbers, effects in SPLIT_TIERS:
+            tier = {"Total": 0}
+            tier.update((effect, 0) for effect in effects)
+            self.split_tiers[label] = tier
+            effect_flags = [(effect, EFFECT_FLAGS[effect]) for effect in effects]
+            for split_number in split_numbers:
+                self.tier_by_split[split_number] = (tier, effect_flags)
+
+        # Per card luck score, drought state and effect hits
+        self.card_luck = {}
+        self.card_droughts = {}
+        self.card_hits = {}
+
+        # Streaks of consecutive splits across all cards
+        self.streaks = {key: {"length": 0, "cards": []} for _, key, _ in STREAK_KEYS}
+        self.current_streak = {name: [] for name, _, _ in STREAK_KEYS}
+
+    def add(self, card_def_id, surface_effect_def_id, reveal_effect_def_id):
+        """Fold one split into every counter."""
+        self.add_flags(card_def_id, surface_effect_mask(surface_effect_def_id) | reveal_effect_mask(reveal_effect_def_id))
+
+    def add_flags(self, card_def_id, mask):
+        """Fold one split into every counter, given its effect flags."""
+        self.total_splits += 1
+        count = self.card_counts.get(card_def_id, 0) + 1
+        self.card_counts[card_def_id] = count
+
+        # Background and flare rolls and hits, by the eligibility rules
+        outcome = split_outcome(count if count < LAST_FIRST_SPLIT else LAST_FIRST_SPLIT, mask)
+        counters = self.__dict__
+        for name in outcome[0]:
+            counters[name] += 1
+
+        # Split tier specific counts
+        tier_entry = self.tier_by_split.get(count)
+        if tier_entry is not None:
+            tier, effect_flags = tier_entry
+            tier["Total"] += 1
+            for effect, flag in effect_flags:
+                if mask & flag:
+                    tier[effect] += 1
+
+        # Summary hits, counted on every split
+        if mask & INK:
+            self.all_ink_hits += 1
+        if mask & GOLD_FOIL:
+            self.all_gold_hits += 1
+        if mask & KIRBY:
+            self.all_kirby_hits += 1
+            if mask & INK:
+                self.ink_kirby_hits += 1
+            if mask & GOLD_FOIL:
+                self.gold_kirby_hits += 1
+
+        if mask & ANY_COLOR:
+            for color, flag in COLOR_FLAGS.items():
+                if mask & flag:
+                    self.color_counts[color] += 1
+
+        self._add_history(card_def_id, outcome, mask)
+
+    def add_history(self, card_def_id, count, mask):
+        """Fold one split into the order dependent luck, drought and streak state.
+
+        count is the split's number for its card and mask its effect flags.
+        """
+        self._add_history(card_def_id, split_outcome(count if count < LAST_FIRST_SPLIT else LAST_FIRST_SPLIT, mask), mask)
+
+    def _add_history(self, card_def_id, outcome, mask):
+        _, luck, drought_hits, card_hits = outcome
+
+        # Luck: negative for every possible roll, positive for every hit
+        self.card_luck[card_def_id] = self.card_luck.get(card_def_id, 0) + luck
+
+        # Droughts: eligible splits since the last hit
+        droughts = self.card_droughts.get(card_def_id)
+        if droughts is None:
+            droughts = self.card_droughts[card_def_id] = dict.fromkeys(DROUGHT_KEYS, 0)
+        for effect, hit in drought_hits:
+            self._update_drought(droughts, effect, hit)
+
+        hits = self.card_hits.get(card_def_id)
+        if hits is None:
+            hits = self.card_hits[card_def_id] = {effect: 0 for effect in CARD_HIT_EFFECTS}
+        for effect in card_hits:
+            hits[effect] += 1
+
+        # Streaks: consecutive hits across all cards
+        for name, key, flag in STREAK_KEYS:
+            self._update_streak(name, key, mask & flag, card_def_id)
+
+    @staticmethod
+    def _update_drought(droughts, effect, hit):
+        if hit:
+            droughts[f"{effect} Drought"] = 0
+        else:
+            drought = droughts[f"{effect} Drought"] + 1
+            droughts[f"{effect} Drought"] = drought
+            if drought > droughts[f"Max {effect} Drought"]:
+                droughts[f"Max {effect} Drought"] = drought
+
+    def _update_streak(self, name, key, hit, card_def_id):
+        if hit:
+            current = self.current_streak[name]
+            current.append(card_def_id)
+            if len(current) > self.streaks[key]["length"]:
+                self.streaks[key] = {"length": len(current), "cards": current}
+        else:
+            self.current_streak[name] = []
+
+    def to_dict(self):
+        """Return the accumulated state as JSON serializable data."""
+        return {name: value for name, value in vars(self).items() if name != 'tier_by_split'}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild an accumulator from the output of to_dict."""
+        stats = cls()
+        for name, value in state.items():
+            if name == 'split_tiers':
+                # Update in place so tier_by_split keeps pointing at the same dicts
+                for label, tier in value.items():
+                    stats.split_tiers[label].update(tier)
+            else:
+                setattr(stats, name, value)
+        return stats
+
+    def merge(self, other):
+        """Fold another accumulator's results into this one and return self.
+
+        Counters, per-card split counts, hits and luck add up, while droughts and
+        streaks keep the longest, so partial results from any number of users
+        can be merged in any order to give the same totals. Only ties between
+        equally lucky cards or equally long droughts and streaks depend on the
+        order. Ongoing droughts and streaks belong to a single history, so
+        don't add splits to a merged accumulator.
+        """
+        for name, value in vars(other).items():
+            if isinstance(value, int):
+                setattr(self, name, getattr(self, name) + value)
+
+        for color, count in other.color_counts.items():
+            self.color_counts[color] = self.color_counts.get(color, 0) + count
+        for label, tier in other.split_tiers.items():
+            for key, count in tier.items():
+                self.split_tiers[label][key] += count
+        for card_def_id, count in other.card_counts.items():
+            self.card_counts[card_def_id] = self.card_counts.get(card_def_id, 0) + count
+        for card_def_id, luck in other.card_luck.items():
+            self.card_luck[card_def_id] = self.card_luck.get(card_def_id, 0) + luck
+        for card_def_id, hits in other.card_hits.items():
+            own = self.card_hits.setdefault(card_def_id, {effect: 0 for effect in CARD_HIT_EFFECTS})
+            for effect, count in hits.items():
+                own[effect] += count
+
+        for card_def_id, droughts in other.card_droughts.items():
+            own = self.card_droughts.get(card_def_id)
+            if own is None:
+                self.card_droughts[card_def_id] = dict(droughts)
+            else:
+                for key, drought in droughts.items():
+                    own[key] = max(own[key], drought)
+
+        for key, streak in other.streaks.items():
+            if streak["length"] > self.streaks[key]["length"]:
+                self.streaks[key] = {"length": streak["length"], "cards": list(streak["cards"])}
+        for name, current in other.current_streak.items():
+            if len(current) > len(self.current_streak[name]):
+                self.current_streak[name] = list(current)
+        return self
+
+def table_effect_flags(table):
+    """Return per-code surface and reveal flag lists for a SplitTable's string pool."""
+    strings = table.pool.strings
+    return [surface_effect_mask(string) for string in strings], [reveal_effect_mask(string) for string in strings]
+
+def table_split_numbers(table):
+    """Each split's number for its card, 1 for the card's first split.
+
+    Returns a NumPy array when NumPy is installed, otherwise a list.
+    """
+    if np is None:
+        seen = {}
+        split_numbers = []
+        for card_code in table.card_codes:
+            seen[card_code] = count = seen.get(card_code, 0) + 1
+            split_numbers.append(count)
+        return split_numbers
+
+    # Position within its run after a stable sort by card
+    total = len(table)
+    cards = np.frombuffer(table.card_codes, dtype=np.uintc)
+    order = np.argsort(cards, kind='stable')
+    positions = np.arange(total)
+    run_starts = np.ones(total, dtype=bool)
+    run_starts[1:] = cards[order][1:] != cards[order][:-1]
+    counts = np.empty(total, dtype=np.int64)
+    counts[order] = positions - np.maximum.accumulate(np.where(run_starts, positions, 0)) + 1
+    return counts
+
+def table_masks(table):
+    """Each split's effect flags, as a NumPy array when NumPy is installed, otherwise a list."""
+    surface_flags, reveal_flags = table_effect_flags(table)
+    if np is None:
+        return [surface_flags[surface_code] | reveal_flags[reveal_code]
+                for surface_code, reveal_code in zip(table.surface_codes, table.reveal_codes)]
+    surfaces = np.frombuffer(table.surface_codes, dtype=np.uintc)
+    reveals = np.frombuffer(table.reveal_codes, dtype=np.uintc)
+    return np.array(surface_flags, dtype=np.int64)[surfaces] | np.array(reveal_flags, dtype=np.int64)[reveals]
+
+def analyze_table_vectorized(table):
+    """NumPy version of analyze_splits for a SplitTable.
+
+    Each split's number for its card comes from one stable sort by card
+    code, and every counter is a masked sum or bincount over the columns.
+    Only the luck, drought and streak state is still walked split by split.
+    """
+    stats = SplitStatistics()
+    total = len(table)
+    if not total:
+        return stats
+
+    strings = table.pool.strings
+    cards = np.frombuffer(table.card_codes, dtype=np.uintc)
+    counts = table_split_numbers(table)
+
+    # Classify each distinct string once, then gather the flags per split
+    masks = table_masks(table)
+    effect_hits = {rule.name: (masks & rule.flag) != 0 for rule in EFFECT_RULES}
+
+    stats.total_splits = total
+    for rule in EFFECT_RULES:
+        eligible = counts >= rule.first_split
+        if rule.rolls is not None:
+            setattr(stats, rule.rolls, int(eligible.sum()))
+        setattr(stats, rule.hits, int((effect_hits[rule.name] & eligible).sum()))
+
+    # Split tiers: map each split number to its tier index, the last slot collects the rest
+    no_tier = len(SPLIT_TIERS)
+    highest_split = max(split_number for _, split_numbers, _ in SPLIT_TIERS for split_number in split_numbers)
+    tier_lookup = np.full(highest_split + 2, no_tier, dtype=np.intp)
+    for index, (_, split_numbers, _) in enumerate(SPLIT_TIERS):
+        tier_lookup[list(split_numbers)] = index
+    tier_index = tier_lookup[np.minimum(counts, highest_split + 1)]
+
+    tier_totals = np.bincount(tier_index, minlength=no_tier + 1)
+    for index, (label, _, _) in enumerate(SPLIT_TIERS):
+        stats.split_tiers[label]["Total"] = int(tier_totals[index])
+    for effect, hits in effect_hits.items():
+        tier_hits = np.bincount(tier_index[hits], minlength=no_tier + 1)
+        for index, (label, _, effects) in enumerate(SPLIT_TIERS):
+            if effect in effects:
+                stats.split_tiers[label][effect] = int(tier_hits[index])
+
+    ink, gold_foil, kirby = effect_hits["Ink"], effect_hits["Gold"], effect_hits["Kirby"]
+    stats.all_ink_hits = int(ink.sum())
+    stats.all_gold_hits = int(gold_foil.sum())
+    stats.all_kirby_hits = int(kirby.sum())
+    stats.ink_kirby_hits = int((ink & kirby).sum())
+    stats.gold_kirby_hits = int((gold_foil & kirby).sum())
+
+    for color, flag in COLOR_FLAGS.items():
+        stats.color_counts[color] = int(((masks & flag) != 0).sum())
+
+    # Card totals in order of first appearance, as the sequential pass builds them
+    unique_cards, first_seen, card_totals = np.unique(cards, return_index=True, return_counts=True)
+    for position in np.argsort(first_seen, kind='stable'):
+        stats.card_counts[strings[unique_cards[position]]] = int(card_totals[position])
+
+    add_history = stats.add_history
+    for card_code, count, mask in zip(table.card_codes, counts.tolist(), masks.tolist()):
+        add_history(strings[card_code], count, mask)
+
+    return stats
+
+def analyze_splits(splits):
+    """Run every statistic over a SplitTable or (CardDefId, SurfaceEffectDefId, CardRevealEffectDefId, ...) records.
+
+    A SplitTable is analyzed with NumPy when it is installed.
+    """
+    if isinstance(splits, SplitTable) and np is not None:
+        return analyze_table_vectorized(splits)
+
+    stats = SplitStatistics()
+    if isinstance(splits, SplitTable):
+        # Work straight off the code columns with the flags of each distinct string
+        strings = splits.pool.strings
+        surface_flags, reveal_flags = table_effect_flags(splits)
+        add_flags = stats.add_flags
+        for card_code, surface_code, reveal_code in zip(splits.card_codes, splits.surface_codes, splits.reveal_codes):
+            add_flags(strings[card_code], surface_flags[surface_code] | reveal_flags[reveal_code])
+        return stats
+
+    add = stats.add
+    for split in splits:
+        add(split[0], split[1], split[2])
+    return stats
+
+def analyze_shard(strings, columns):
+    """Analyze one card shard's columns in a worker process, returning the SplitStatistics state."""
+    table = SplitTable()
+    table.pool.strings = strings
+    for name, column in zip(SplitTable.COLUMNS, columns):
+        setattr(table, name, column)
+    return analyze_splits(table).to_dict()
+
+def shard_table(table, shards):
+    """Split a table's columns into shards by CardDefId, each in the table's own order.
+
+    Cards go to shard (pool code mod shards), which deals the cards out in
+    order of first appearance, so every card's splits land in one shard.
+    """
+    if np is not None:
+        shard_of = np.frombuffer(table.card_codes, dtype=np.uintc) % shards
+        parts = []
+        for shard in range(shards):
+            positions = np.flatnonzero(shard_of == shard)
+            parts.append([array(getattr(table, name).typecode, np.frombuffer(getattr(table, name), dtype=dtype)[positions].tobytes())
+                          for name, dtype in zip(SplitTable.COLUMNS, (np.uintc, np.uintc, np.uintc, np.int64))])
+        return parts
+
+    shard_of = [card_code % shards for card_code in table.card_codes]
+    parts = []
+    for shard in range(shards):
+        selected = [part == shard for part in shard_of]
+        parts.append([array(getattr(table, name).typecode, compress(getattr(table, name), selected)) for name in SplitTable.COLUMNS])
+    return parts
+
+def streak_runs(masks, flag):
+    """Every run of consecutive splits with the flag, as (start, end) positions, given table_masks."""
+    if np is not None:
+        hits = np.zeros(len(masks) + 2, dtype=np.int8)
+        hits[1:-1] = (masks & flag) != 0
+        edges = np.flatnonzero(np.diff(hits))
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+    runs = []
+    start = None
+    for position, mask in enumerate(masks):
+        if mask & flag:
+            if start is None:
+                start = position
+        elif start is not None:
+            runs.append((start, position))
+            start = None
+    if start is not None:
+        runs.append((start, len(masks)))
+    return runs
+
+def run_cards(table, run):
+    """The CardDefIds of the splits in a (start, end) run, in order."""
+    strings = table.pool.strings
+    return [strings[code] for code in table.card_codes[run[0]:run[1]]]
+
+def table_streaks(table):
+    """The longest and ongoing streak of every STREAK_KEYS effect across all cards, as SplitStatistics keeps them.
+
+    Returns (streaks, current_streak). Ties keep the earliest streak.
+    """
+    masks = table_masks(table)
+    streaks = {}
+    current_streak = {}
+    for name, key, flag in STREAK_KEYS:
+        runs = streak_runs(masks, flag)
+        longest = max(runs, key=lambda run: run[1] - run[0], default=None)
+        streaks[key] = {"length": longest[1] - longest[0], "cards": run_cards(table, longest)} if longest else {"length": 0, "cards": []}
+        ongoing = runs and runs[-1][1] == len(table)
+        current_streak[name] = run_cards(table, runs[-1]) if ongoing else []
+    return streaks, current_streak
+
+class Leaderboards:
+    """TopK rankings of every ranked metric: luck both ways, splits per card, and each effect's longest droughts and streaks.
+
+    Entries are CardDefIds, or [source, CardDefId] when the statistics of
+    several submissions are ranked together, and streak entries the cards
+    in the streak. Leaderboards built in separate workers merge into the
+    same result as one built over everything in that order.
+    """
 
-    # Write sorted information to a text file
+    def __init__(self, k=LEADERBOARD_SIZE):
+        self.boards = {'luckiest': TopK(k), 'unluckiest': TopK(k, lowest=True), 'most_split': TopK(k)}
+        for name, _ in HISTORY_EFFECTS:
+            self.boards[f"{name.lower()}_drought"] = TopK(k)
+        for name, _, _ in STREAK_KEYS:
+            self.boards[f"{name}_streak"] = TopK(k)
+
+    @classmethod
+    def from_statistics(cls, stats, k=LEADERBOARD_SIZE, table=None):
+        return cls(k).add_statistics(stats, table=table)
+
+    def add_statistics(self, stats, source=None, table=None):
+        """Rank every card of one SplitStatistics and return self.
+
+        Streaks are ranked from every run in the chronological table when it
+        is given, otherwise only the longest streak the statistics kept.
+        """
+        label = (lambda value: value) if source is None else (lambda value: [source, value])
+        luckiest, unluckiest = self.boards['luckiest'], self.boards['unluckiest']
+        for card_def_id, luck in stats.card_luck.items():
+            luckiest.offer(luck, label(card_def_id))
+            unluckiest.offer(luck, label(card_def_id))
+        most_split = self.boards['most_split']
+        for card_def_id, count in stats.card_counts.items():
+            most_split.offer(count, label(card_def_id))
+        for name, _ in HISTORY_EFFECTS:
+            board = self.boards[f"{name.lower()}_drought"]
+            key = f"Max {name} Drought"
+            for card_def_id, droughts in stats.card_droughts.items():
+                board.offer(droughts[key], label(card_def_id))
+
+        masks = table_masks(table) if table is not None else None
+        for name, key, flag in STREAK_KEYS:
+            board = self.boards[f"{name}_streak"]
+            if masks is not None:
+                for run in streak_runs(masks, flag):
+                    if board.accepts(run[1] - run[0]):
+                        board.offer(run[1] - run[0], label(run_cards(table, run)))
+            elif stats.streaks[key]["length"]:
+                board.offer(stats.streaks[key]["length"], label(list(stats.streaks[key]["cards"])))
+        return self
+
+    def merge(self, other):
+        """Fold another Leaderboards into this one, ranking its entries after this one's on ties, and return self."""
+        for name, board in other.boards.items():
+            self.boards[name].merge(board)
+        return self
+
+    def to_dict(self):
+        return {name: board.to_dict() for name, board in self.boards.items()}
+
+    @classmethod
+    def from_dict(cls, state):
+        leaderboards = cls()
+        leaderboards.boards = {name: TopK.from_dict(board) for name, board in state.items()}
+        return leaderboards
+
+    def report(self):
+        """Every leaderboard best first, as JSON serializable data."""
+        return {name: [{'value': score, 'entry': entry} for score, entry in board.items()] for name, board in self.boards.items()}
+
+def analyze_sharded(table, jobs=None):
+    """analyze_splits over a chronological SplitTable, with the per-card work spread over processes.
+
+    Split numbers, luck, droughts and hits only depend on each card's own
+    splits, so every card shard is analyzed in its own worker and the
+    results merged. Only the streaks cross cards, and they come from a
+    separate scan of the whole table. The result is identical to
+    analyze_splits, down to the order of every per-card dict.
+    """
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    strings = table.pool.strings
+    with METRICS.stage('shard_table'):
+        parts = shard_table(table, jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        states = list(executor.map(analyze_shard, [strings] * jobs, parts))
+
+    stats = SplitStatistics()
+    for state in states:
+        stats.merge(SplitStatistics.from_dict(state))
+
+    # Per-card entries in order of first appearance, as the serial pass adds them
+    order = [strings[code] for code in dict.fromkeys(table.card_codes)]
+    for name in ('card_counts', 'card_luck', 'card_droughts', 'card_hits'):
+        entries = getattr(stats, name)
+        setattr(stats, name, {card_def_id: entries[card_def_id] for card_def_id in order})
+
+    with METRICS.stage('table_streaks'):
+        stats.streaks, stats.current_streak = table_streaks(table)
+    return stats
+
+class TimeIndex:
+    """Prefix sums of the roll and hit counters over a chronological SplitTable.
+
+    sums[name][i] holds the TIME_SERIES counter name over the first i splits,
+    so the counters for any time range come from two binary searches on the
+    split times and one subtraction each, without walking the splits.
+    """
+
+    def __init__(self, table):
+        self.times = table.times
+        self.sums = {}
+        split_numbers = table_split_numbers(table)
+        masks = table_masks(table)
+        for name, (first_split, flag) in TIME_SERIES.items():
+            if np is not None:
+                counted = split_numbers >= first_split
+                if flag is not None:
+                    counted &= (masks & flag) != 0
+                sums = np.zeros(len(table) + 1, dtype=np.uintc)
+                np.cumsum(counted, out=sums[1:])
+                self.sums[name] = array('I', sums.tobytes())
+            elif flag is None:
+                self.sums[name] = array('I', accumulate((count >= first_split for count in split_numbers), initial=0))
+            else:
+                counted = (count >= first_split and (mask & flag) != 0 for count, mask in zip(split_numbers, masks))
+                self.sums[name] = array('I', accumulate(counted, initial=0))
+
+    def window(self, start=None, end=None):
+        """Counters over the splits created from start up to but not including end, in epoch microseconds.
+
+        Either bound can be None to leave that side open.
+        """
+        low = 0 if start is None else bisect.bisect_left(self.times, start)
+        high = len(self.times) if end is None else bisect.bisect_left(self.times, end)
+        high = max(low, high)
+        counts = {'splits': high - low}
+        for name, sums in self.sums.items():
+            counts[name] = sums[high] - sums[low]
+        return counts
+
+    def monthly(self):
+        """Counters for every calendar month (UTC) from the first split to the last, as (YYYY-MM, counters)."""
+        # Missing times sort first and don't belong to any month
+        first = bisect.bisect_right(self.times, MISSING_TIME)
+        if first == len(self.times):
+            return []
+        month = (EPOCH + timedelta(microseconds=self.times[first])).date().replace(day=1)
+        last = (EPOCH + timedelta(microseconds=self.times[-1])).date()
+
+        months = []
+        while month <= last:
+            following = (month + timedelta(days=32)).replace(day=1)
+            start = (month - EPOCH_DATE).days * MICROSECONDS_PER_DAY
+            end = (following - EPOCH_DATE).days * MICROSECONDS_PER_DAY
+            months.append((f"{month:%Y-%m}", self.window(start, end)))
+            month = following
+        return months
+
+class CardIndex:
+    """Every card's splits in chronological order next to its aggregates from SplitStatistics.
+
+    positions maps each CardDefId to the rows of its splits in the table, so
+    lookup() answers one card's full history without scanning the others.
+    """
+
+    def __init__(self, table, stats):
+        self.table = table
+        self.stats = stats
+        self.positions = {}
+        strings = table.pool.strings
+        if np is not None and len(table):
+            # Group the rows by card with one stable sort, keeping each card's splits in order
+            cards = np.frombuffer(table.card_codes, dtype=np.uintc)
+            order = np.argsort(cards, kind='stable').astype(np.uintc)
+            sorted_cards = cards[order]
+            starts = np.flatnonzero(np.concatenate(([True], sorted_cards[1:] != sorted_cards[:-1]))).tolist()
+            for start, end in zip(starts, starts[1:] + [len(table)]):
+                self.positions[strings[sorted_cards[start]]] = array('I', order[start:end].tobytes())
+        else:
+            by_code = {}
+            for position, card_code in enumerate(table.card_codes):
+                rows = by_code.get(card_code)
+                if rows is None:
+                    rows = by_code[card_code] = array('I')
+                rows.append(position)
+            self.positions = {strings[card_code]: rows for card_code, rows in by_code.items()}
+
+    def summary(self, card_def_id):
+        """Aggregates for one card: splits, luck, rolls per tier and effect, hits and droughts."""
+        stats = self.stats
+        count = stats.card_counts.get(card_def_id, 0)
+        return {
+            'card': card_def_id,
+            'splits': count,
+            'luck': stats.card_luck.get(card_def_id, 0),
+            'tier_splits': {label: sum(1 for split_number in split_numbers if split_number <= count)
+                            for label, split_numbers, _ in SPLIT_TIERS},
+            'rolls': {effect: max(0, count - RULES_BY_NAME[effect].first_split + 1) for effect, _ in HISTORY_EFFECTS},
+            'hits': dict(stats.card_hits.get(card_def_id, {})),
+            'droughts': dict(stats.card_droughts.get(card_def_id, {})),
+        }
+
+    def rows(self):
+        """summary() for every card, most split first."""
+        return [self.summary(card_def_id) for card_def_id in
+                sorted(self.stats.card_counts, key=self.stats.card_counts.get, reverse=True)]
+
+    def lookup(self, card_def_id):
+        """A card's summary plus every split it got in chronological order, or None if it has none."""
+        positions = self.positions.get(card_def_id)
+        if positions is None:
+            return None
+        table = self.table
+        strings = table.pool.strings
+        card = self.summary(card_def_id)
+        card['history'] = [
+            {'split': split_number,
+             'surface': strings[table.surface_codes[position]],
+             'reveal': strings[table.reveal_codes[position]],
+             'time': format_time_created(table.times[position])}
+            for split_number, position in enumerate(positions, start=1)]
+        return card
+
+def observed_drop_rates(stats):
+    """The collection's own hit rate for every HISTORY_EFFECTS effect, among the splits that could roll it."""
+    return {name: calculate_percentage(getattr(stats, RULES_BY_NAME[name].hits), getattr(stats, RULES_BY_NAME[name].rolls)) / 100
+            for name, _ in HISTORY_EFFECTS}
+
+def simulate_card_histories(rates, split_counts, luck, droughts, simulations, seed):
+    """Simulate card histories and count how every card's luck and droughts compare.
+
+    Each simulated history is one card's splits under the drop rates, and
+    a card with n splits is compared against the first n splits of every
+    history, so one set of draws serves every card. Cards with the same
+    number of splits share one sorted column of simulated values, searched
+    for each card's own value. Returns the number of histories with lower
+    and with equal luck, and with a longest drought at least as long for
+    each effect, as arrays in card order.
+    """
+    rng = np.random.default_rng(seed)
+    split_counts = np.asarray(split_counts, dtype=np.intp)
+    luck = np.asarray(luck, dtype=np.int64)
+    droughts = {name: np.asarray(observed, dtype=np.int64) for name, observed in droughts.items()}
+    longest_split = int(split_counts.max())
+    split_numbers = np.arange(1, longest_split + 1, dtype=np.int32)
+    positions = split_numbers - 1
+    columns, card_columns = np.unique(split_counts - 1, return_inverse=True)
+    column_cards = [np.flatnonzero(card_columns == index) for index in range(len(columns))]
+    first_splits = {name: RULES_BY_NAME[name].first_split for name, _ in HISTORY_EFFECTS}
+
+    # Backgrounds exclude each other, as do flares, so each split takes one draw
+    # for its background and one for its flare, and every effect hits when its
+    # draw lands in the effect's own slice of [0, 1)
+    intervals = {}
+    upper = {}
+    for name, flag in HISTORY_EFFECTS:
+        slot = 'background' if flag & BACKGROUND_FLAGS else 'flare'
+        lower = upper.get(slot, 0.0)
+        upper[slot] = lower + rates[name]
+        intervals[name] = (slot, lower, upper[slot])
+
+    luck_below = np.zeros(len(split_counts), dtype=np.int64)
+    luck_equal = np.zeros(len(split_counts), dtype=np.int64)
+    drought_above = {name: np.zeros(len(split_counts), dtype=np.int64) for name in droughts}
+    chunk_size = max(1, SIMULATION_CHUNK_CELLS // longest_split)
+    for start in range(0, simulations, chunk_size):
+        count = min(chunk_size, simulations - start)
+
+        draws = {slot: rng.random((count, longest_split), dtype=np.float32) for slot in ('background', 'flare')}
+        hits = {name: (draws[slot] >= lower) & (draws[slot] < upper) & (split_numbers >= first_splits[name])
+                for name, (slot, lower, upper) in intervals.items()}
+
+        # Same points as split_outcome
+        steps = np.zeros((count, longest_split), dtype=np.int32)
+        for name, points in LUCK_HIT_POINTS.items():
+            steps += points * hits[name]
+        for (first, second), points in LUCK_PAIR_POINTS.items():
+            steps += points * (hits[first] & hits[second])
+        for name, points in LUCK_ROLL_POINTS.items():
+            steps += points * (split_numbers >= RULES_BY_NAME[name].first_split)
+        simulated_luck = np.sort(np.cumsum(steps, axis=1, dtype=np.int32)[:, columns], axis=0)
+        for index, cards in enumerate(column_cards):
+            below = np.searchsorted(simulated_luck[:, index], luck[cards], 'left')
+            luck_below[cards] += below
+            luck_equal[cards] += np.searchsorted(simulated_luck[:, index], luck[cards], 'right') - below
+
+        # Drought at each split: eligible splits since the last hit, then its running maximum
+        for name, observed in droughts.items():
+            first_position = first_splits[name] - 1
+            last_hit = np.maximum.accumulate(np.where(hits[name], positions, np.int32(first_position - 1)), axis=1)
+            drought = np.where(positions >= first_position, positions - last_hit, 0)
+            longest = np.sort(np.maximum.accumulate(drought, axis=1)[:, columns], axis=0)
+            for index, cards in enumerate(column_cards):
+                drought_above[name][cards] += count - np.searchsorted(longest[:, index], observed[cards], 'left')
+
+    return luck_below, luck_equal, drought_above
+
+def streak_p_value(split_numbers, first_split, rate, length):
+    """Exact chance of a streak of at least length hits in a row somewhere in the chronological splits.
+
+    Every split from first_split on hits independently with the given rate
+    and any other split breaks the streak, so the chance follows from the
+    distribution of the current streak length, carried split by split.
+    """
+    if length <= 0:
+        return 1.0
+    current = [1.0] + [0.0] * (length - 1)  # Chance the ongoing streak is 0 .. length - 1 long
+    reached = 0.0
+    for split_number in split_numbers:
+        if split_number < first_split:
+            current = [1.0 - reached] + [0.0] * (length - 1)
+            continue
+        reached += rate * current[-1]
+        current = [(1.0 - rate) * sum(current)] + [rate * chance for chance in current[:-1]]
+    return min(1.0, reached)
+
+def simulate_significance(stats, simulations, rates=None, jobs=1, seed=None, split_numbers=None):
+    """Percentiles and p-values for every card's luck and longest droughts, and for the streaks.
+
+    Draws simulated histories under the drop rates (by default the
+    collection's own, see observed_drop_rates) for each card's actual
+    number of splits, optionally spreading the simulations over a process
+    pool. A luck percentile near 0 is unusually unlucky, near 100 unusually
+    lucky. Drought p-values are the chance of a drought at least that long
+    by luck alone. Streaks span every card, so they are tested exactly
+    against split_numbers, the chronological split numbers from
+    table_split_numbers, when given. Returns None without NumPy.
+    """
+    if np is None:
+        print("Simulation needs NumPy (pip install numpy)")
+        return None
+    rates = dict(observed_drop_rates(stats), **(rates or {}))
+    cards = [card_def_id for card_def_id, count in stats.card_counts.items() if count > 0]
+    result = {'simulations': simulations, 'seed': seed, 'rates': rates, 'cards': {}, 'streaks': {}}
+    if not cards or simulations <= 0:
+        return result
+
+    split_counts = [stats.card_counts[card_def_id] for card_def_id in cards]
+    luck = [stats.card_luck.get(card_def_id, 0) for card_def_id in cards]
+    droughts = {name: [stats.card_droughts.get(card_def_id, {}).get(f"Max {name} Drought", 0) for card_def_id in cards]
+                for name, _ in HISTORY_EFFECTS}
+
+    # Independent streams for every worker, all derived from the one seed
+    jobs = max(1, min(jobs or os.cpu_count() or 1, simulations))
+    seeds = np.random.SeedSequence(seed).spawn(jobs)
+    shares = [simulations // jobs + (index < simulations % jobs) for index in range(jobs)]
+    arguments = [(rates, split_counts, luck, droughts, share, job_seed) for share, job_seed in zip(shares, seeds)]
+    if jobs == 1:
+        parts = [simulate_card_histories(*arguments[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            parts = list(executor.map(simulate_card_histories, *zip(*arguments)))
+
+    luck_below = sum(part[0] for part in parts)
+    luck_equal = sum(part[1] for part in parts)
+    drought_above = {name: sum(part[2][name] for part in parts) for name in droughts}
+    for index, card_def_id in enumerate(cards):
+        below, equal = int(luck_below[index]), int(luck_equal[index])
+        result['cards'][card_def_id] = {
+            'luck': {
+                'value': luck[index],
+                'percentile': 100 * (below + equal / 2) / simulations,
+                'p_unlucky': (below + equal + 1) / (simulations + 1),
+                'p_lucky': (simulations - below + 1) / (simulations + 1),
+            },
+            'droughts': {name: {'value': droughts[name][index],
+                                'p_value': (int(drought_above[name][index]) + 1) / (simulations + 1)}
+                         for name in droughts},
+        }
+
+    if split_numbers is not None:
+        if isinstance(split_numbers, np.ndarray):
+            split_numbers = split_numbers.tolist()
+        for name, _ in HISTORY_EFFECTS:
+            length = stats.streaks[f"highest_{name.lower()}_streak"]["length"]
+            result['streaks'][name] = {'length': length,
+                                       'p_value': streak_p_value(split_numbers, RULES_BY_NAME[name].first_split, rates[name], length)}
+    return result
+
+def write_significance(significance, output_file):
+    """Save simulate_significance results as JSON."""
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(significance, file, indent=2)
+
+    print(f"Significance written to {output_file}")
+
+def save_statistics_state(stats, path):
+    """Save an accumulator so it can be merged with others later."""
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'version': STATS_STATE_VERSION, 'stats': stats.to_dict()}, file)
+
+def load_statistics_state(path):
+    """Load an accumulator saved by save_statistics_state."""
+    with open(path, 'r', encoding='utf-8') as file:
+        state = json.load(file)
+    if state.get('version') != STATS_STATE_VERSION:
+        raise ValueError(f"{path} was saved by an incompatible version")
+    return SplitStatistics.from_dict(state['stats'])
+
+def load_checkpoint(checkpoint_path):
+    """Read a checkpoint written by save_checkpoint, or return None if there is no usable one."""
     try:
-        with open(RAWLIST_PATH, 'w', encoding='utf-8') as outfile:
-            for card_info in cards_info:
-                card_str = f"{card_info[0]} {card_info[1]} {card_info[2]} {card_info[3]}"
-                outfile.write(f"{card_str}\n")
+        with open(checkpoint_path, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except (IOError, json.JSONDecodeError):
+        return None
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        return None
+    return checkpoint
 
-        print("Output written to rawlist.txt")
-        return True
+def prefix_digest(table, stop):
+    """BLAKE2b digest of the first stop splits of a table: their card, surface and reveal strings and times.
+
+    The strings are hashed rather than their codes, so the digest doesn't
+    depend on the order the string pool interned them in.
+    """
+    encoded = [string.encode('utf-8') for string in table.pool.strings]
+    digest = hashlib.blake2b(digest_size=16)
+    for name in ('card_codes', 'surface_codes', 'reveal_codes'):
+        digest.update(b'\0'.join(map(encoded.__getitem__, islice(getattr(table, name), stop))))
+        digest.update(b'\1')
+    digest.update(table.times[:stop].tobytes())
+    return digest.hexdigest()
+
+def save_checkpoint(checkpoint_path, source_path, table, stats):
+    """Record the analysis state after the last split in the table, with a digest of every split it covers."""
+    checkpoint = {
+        'version': CHECKPOINT_VERSION,
+        'source': os.path.abspath(source_path),
+        'last_time': table.times[-1] if len(table) else MISSING_TIME,
+        'digest': prefix_digest(table, len(table)),
+        'stats': stats.to_dict(),
+    }
+    try:
+        with open(checkpoint_path, 'w', encoding='utf-8') as file:
+            json.dump(checkpoint, file)
     except IOError as e:
         print(f"Error: IOError - {e}")
+
+def analyze_incremental(table, source_path, checkpoint_path=CHECKPOINT_PATH):
+    """Like analyze_splits, but only fold in the splits newer than the last checkpoint.
+
+    The checkpoint is discarded and everything recomputed when the splits it
+    covers no longer match the table, e.g. after cards were removed, an
+    older split appeared or an older split's effects or time changed.
+    Checking that still hashes every older split, so only the analysis,
+    not the run, is skipped for them.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    stats = None
+    if checkpoint is not None and checkpoint['source'] == os.path.abspath(source_path):
+        resumed = extend_statistics(table, checkpoint['stats'], checkpoint['last_time'], checkpoint['digest'])
+        if resumed is None:
+            print("Checkpoint no longer matches the collection, recomputing all splits")
+        else:
+            stats, new_splits = resumed
+            print(f"Resumed from checkpoint, {new_splits} new splits")
+
+    if stats is None:
+        stats = analyze_splits(table)
+
+    save_checkpoint(checkpoint_path, source_path, table, stats)
+    return stats
+
+def extend_statistics(table, state, last_time, digest):
+    """Fold the splits newer than last_time into saved SplitStatistics state.
+
+    digest is the prefix_digest of the splits the state counted. Returns
+    (stats, new split count), or None if the splits up to last_time are no
+    longer exactly those.
+    """
+    start = bisect.bisect_right(table.times, last_time)
+    if prefix_digest(table, start) != digest:
+        return None
+
+    strings = table.pool.strings
+    stats = SplitStatistics.from_dict(state)
+    add = stats.add
+    columns = zip(table.card_codes, table.surface_codes, table.reveal_codes)
+    for card_code, surface_code, reveal_code in islice(columns, start, None):
+        add(strings[card_code], strings[surface_code], strings[reveal_code])
+    return stats, len(table) - start
+
+def open_archive(path=ARCHIVE_PATH):
+    """Open (creating if needed) the SQLite history archive.
+
+    Splits are unique on (card, time, surface, reveal), and that index also
+    serves lookups by card, in time order. splits_time serves time ranges.
+    """
+    connection = sqlite3.connect(path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.executescript(ARCHIVE_SCHEMA)
+    return connection
+
+def archive_table(connection, table, source_path):
+    """Upsert a collection's splits into the archive as a new snapshot, in one transaction.
+
+    Splits seen before only have their last_snapshot moved up, so the
+    archive keeps every split ever seen, including cards since recycled.
+    Returns (snapshot id, new split count).
+    """
+    strings = table.pool.strings
+    with connection:
+        before = connection.execute('SELECT count(*) FROM splits').fetchone()[0]
+        snapshot = connection.execute('INSERT INTO snapshots (taken, source, splits) VALUES (?, ?, ?)',
+                                      (int(time.time()), os.path.abspath(source_path), len(table))).lastrowid
+        rows = ((strings[card_code], strings[surface_code], strings[reveal_code], epoch_us, snapshot, snapshot)
+                for card_code, surface_code, reveal_code, epoch_us
+                in zip(table.card_codes, table.surface_codes, table.reveal_codes, table.times))
+        connection.executemany('INSERT INTO splits VALUES (?, ?, ?, ?, ?, ?) '
+                               'ON CONFLICT (card, time, surface, reveal) DO UPDATE SET last_snapshot = excluded.last_snapshot', rows)
+        after = connection.execute('SELECT count(*) FROM splits').fetchone()[0]
+    return snapshot, after - before
+
+def archive_filter(snapshot=None, card_def_id=None):
+    """Return the WHERE clause and parameters selecting splits for archive_splits."""
+    conditions = []
+    parameters = []
+    if snapshot is not None:
+        conditions.append('first_snapshot <= ? AND last_snapshot >= ?')
+        parameters += [snapshot, snapshot]
+    if card_def_id is not None:
+        conditions.append('card = ?')
+        parameters.append(card_def_id)
+    return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), parameters
+
+def archive_splits(connection, snapshot=None, card_def_id=None):
+    """Stream archived splits as Split records in chronological order, straight from a cursor.
+
+    By default every split ever archived is included, otherwise only those
+    present in the given snapshot, or only one card's.
+    """
+    conditions, parameters = archive_filter(snapshot, card_def_id)
+    cursor = connection.execute(f'SELECT card, surface, reveal, time FROM splits{conditions} ORDER BY time, rowid', parameters)
+    for card_def_id, surface, reveal, epoch_us in cursor:
+        yield Split(card_def_id, surface, reveal, format_time_created(epoch_us))
+
+def analyze_archive(connection, snapshot=None):
+    """Run every statistic over the archive, holding only the per-card state in memory.
+
+    Gives the same statistics as analyze_splits on the same splits, however
+    many there are.
+    """
+    stats = SplitStatistics()
+    add = stats.add
+    for split in archive_splits(connection, snapshot):
+        add(split[0], split[1], split[2])
+    return stats
+
+def write_archive(table, source_path, archive_path=ARCHIVE_PATH):
+    """Add a collection's splits to the history archive as a new snapshot."""
+    try:
+        connection = open_archive(archive_path)
+        try:
+            snapshot, added = archive_table(connection, table, source_path)
+        finally:
+            connection.close()
+    except sqlite3.Error as e:
+        print(f"Error: sqlite3.Error - {e}")
         return False
 
-def analyze_statistics(input_file, output_file):
-    """Analyze the card information and generate statistics."""
-    # Read the input file
-    with open(input_file, 'r') as file:
-        lines = file.readlines()
-
-    # Initialize counters
-    card_counts = {}
-    total_splits = 0
-    foil_hits = 0
-    prism_hits = 0
-    comic_glimmer_rolls = 0
-    comic_hits = 0
-    glimmer_hits = 0
-    ink_rolls = 0
-    ink_hits = 0
-    gold_rolls = 0
-    gold_hits = 0
-    sparkle_hits = 0
-    kirby_rolls = 0
-    kirby_hits = 0
-
-    split_2_3_total = 0
-    split_2_3_foil_count = 0
-    split_2_3_prism_count = 0
-    split_2_3_comic_count = 0
-    split_2_3_glimmer_count = 0
-
-    split_4_total = 0
-    split_4_foil_count = 0
-    split_4_prism_count = 0
-    split_4_ink_count = 0
-    split_4_comic_count = 0
-    split_4_glimmer_count = 0
-    split_4_sparkle_count = 0
-
-    split_5_total = 0
-    split_5_foil_count = 0
-    split_5_prism_count = 0
-    split_5_ink_count = 0
-    split_5_gold_count = 0
-    split_5_comic_count = 0
-    split_5_glimmer_count = 0
-    split_5_sparkle_count = 0
-
-    split_6_total = 0
-    split_6_foil_count = 0
-    split_6_prism_count = 0
-    split_6_ink_count = 0
-    split_6_gold_count = 0
-    split_6_comic_count = 0
-    split_6_glimmer_count = 0
-    split_6_sparkle_count = 0
-    split_6_kirby_count = 0
-
-    for line in lines:
-        total_splits += 1
-        parts = line.split()
-        card_name = parts[0]
-        surface_effect_def_id = parts[1]
-        reveal_effect_def_id = parts[2] if len(parts) > 2 else ""
-
-        if card_name in card_counts:
-            card_counts[card_name] += 1
+    print(f"Archived snapshot {snapshot} to {archive_path}, {added} new splits")
+    return True
+
+def split_fingerprints(table):
+    """Return a 64-bit fingerprint of every split's normalized record, in table order.
+
+    Each distinct (CardDefId, SurfaceEffectDefId, reveal effect) is hashed
+    once with BLAKE2b, then its hash plus the split's time goes through the
+    SplitMix64 finalizer, a bijection, so splits of the same card and
+    effects never collide and the rest only by 64-bit chance. Fingerprints
+    are stable across runs and machines, with or without NumPy.
+    """
+    encoded = [string.encode('utf-8') for string in table.pool.strings]
+    record_hashes = {}
+    hashes = array('Q')
+    for record in zip(table.card_codes, table.surface_codes, table.reveal_codes):
+        record_hash = record_hashes.get(record)
+        if record_hash is None:
+            digest = hashlib.blake2b(b'\0'.join(encoded[code] for code in record), digest_size=8).digest()
+            record_hash = record_hashes[record] = int.from_bytes(digest, 'little')
+        hashes.append(record_hash)
+
+    if np is not None:
+        with np.errstate(over='ignore'):
+            values = np.frombuffer(hashes, dtype=np.uint64) + np.frombuffer(table.times, dtype=np.int64).view(np.uint64)
+            values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            values ^= values >> np.uint64(31)
+        return array('Q', values.tobytes())
+
+    fingerprints = array('Q')
+    for record_hash, epoch_us in zip(hashes, table.times):
+        value = (record_hash + epoch_us) & 0xFFFFFFFFFFFFFFFF
+        value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+        value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+        fingerprints.append(value ^ (value >> 31))
+    return fingerprints
+
+def write_fingerprints(path, fingerprints, stats):
+    """Save a snapshot's sorted fingerprints along with its SplitStatistics.
+
+    The file is the magic bytes, the header length, a JSON header with the
+    statistics, then the fingerprints as raw 8 byte integers.
+    """
+    fingerprints = array('Q', sorted(fingerprints))
+    header = json.dumps({
+        'version': FINGERPRINT_VERSION,
+        'byteorder': sys.byteorder,
+        'statistics': stats.to_dict(),
+    }).encode('utf-8')
+    header += b' ' * (-(len(FINGERPRINT_MAGIC) + 8 + len(header)) % 8)
+    replace_file(path, FINGERPRINT_MAGIC + struct.pack('<Q', len(header)) + header + fingerprints.tobytes())
+
+def read_fingerprints(path):
+    """Load (sorted fingerprints, statistics dict) saved by write_fingerprints, or None if path isn't a fingerprint file.
+
+    Returns an empty tuple for a fingerprint file saved by an incompatible version.
+    """
+    try:
+        with open(path, 'rb') as file:
+            if file.read(len(FINGERPRINT_MAGIC)) != FINGERPRINT_MAGIC:
+                return None
+            header_size, = struct.unpack('<Q', file.read(8))
+            header = json.loads(file.read(header_size))
+            if header['version'] != FINGERPRINT_VERSION:
+                return ()
+            fingerprints = array('Q')
+            fingerprints.frombytes(file.read())
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    if header['byteorder'] != sys.byteorder:
+        fingerprints.byteswap()
+    return fingerprints, header['statistics']
+
+def diff_fingerprints(old, new):
+    """Compare two sorted fingerprint sequences as multisets in one merge pass.
+
+    Returns (added, removed): the fingerprints only in new and only in old.
+    """
+    added = []
+    removed = []
+    old_index = new_index = 0
+    old_count, new_count = len(old), len(new)
+    while old_index < old_count and new_index < new_count:
+        old_fingerprint, new_fingerprint = old[old_index], new[new_index]
+        if old_fingerprint == new_fingerprint:
+            old_index += 1
+            new_index += 1
+        elif old_fingerprint < new_fingerprint:
+            removed.append(old_fingerprint)
+            old_index += 1
         else:
-            card_counts[card_name] = 1
-
-        # Count surface effects
-        if "Foil" in surface_effect_def_id and "PrismFoil" not in surface_effect_def_id and "GoldFoil" not in surface_effect_def_id:
-            foil_hits += 1
-        if "PrismFoil" in surface_effect_def_id:
-            prism_hits += 1
-
-        # Count reveal effects
-        if card_counts[card_name] > 1:
-            comic_glimmer_rolls += 1
-            if "Comic" in reveal_effect_def_id:
-                comic_hits += 1
-            if "Glimmer" in reveal_effect_def_id:
-                glimmer_hits += 1
-
-        # Count ink rolls and hits
-        if card_counts[card_name] >= 4:
-            ink_rolls += 1
-            if "Ink" in surface_effect_def_id:
-                ink_hits += 1
-
-        # Count gold rolls and hits
-        if card_counts[card_name] >= 5:
-            gold_rolls += 1
-            if "GoldFoil" in surface_effect_def_id:
-                gold_hits += 1
-            if "Sparkle" in reveal_effect_def_id:
-                sparkle_hits += 1
-
-        # Count kirby rolls and hits
-        if card_counts[card_name] >= 6:
-            kirby_rolls += 1
-            if "Kirby" in reveal_effect_def_id:
-                kirby_hits += 1
-
-        # Split 2-3 specific counts
-        if card_counts[card_name] in [2, 3]:
-            split_2_3_total += 1
-            if "Foil" in surface_effect_def_id and "PrismFoil" not in surface_effect_def_id and "GoldFoil" not in surface_effect_def_id:
-                split_2_3_foil_count += 1
-            if "PrismFoil" in surface_effect_def_id:
-                split_2_3_prism_count += 1
-            if "Comic" in reveal_effect_def_id:
-                split_2_3_comic_count += 1
-            if "Glimmer" in reveal_effect_def_id:
-                split_2_3_glimmer_count += 1
-
-        # Split 4 specific counts
-        if card_counts[card_name] == 4:
-            split_4_total += 1
-            if "Foil" in surface_effect_def_id and "PrismFoil" not in surface_effect_def_id and "GoldFoil" not in surface_effect_def_id:
-                split_4_foil_count += 1
-            if "PrismFoil" in surface_effect_def_id:
-                split_4_prism_count += 1
-            if "Ink" in surface_effect_def_id:
-                split_4_ink_count += 1
-            if "Comic" in reveal_effect_def_id:
-                split_4_comic_count += 1
-            if "Glimmer" in reveal_effect_def_id:
-                split_4_glimmer_count += 1
-            if "Sparkle" in reveal_effect_def_id:
-                split_4_sparkle_count += 1
-
-        # Split 5 specific counts
-        if card_counts[card_name] == 5:
-            split_5_total += 1
-            if "Foil" in surface_effect_def_id and "PrismFoil" not in surface_effect_def_id and "GoldFoil" not in surface_effect_def_id:
-                split_5_foil_count += 1
-            if "PrismFoil" in surface_effect_def_id:
-                split_5_prism_count += 1
-            if "Ink" in surface_effect_def_id:
-                split_5_ink_count += 1
-            if "GoldFoil" in surface_effect_def_id:
-                split_5_gold_count += 1
-            if "Comic" in reveal_effect_def_id:
-                split_5_comic_count += 1
-            if "Glimmer" in reveal_effect_def_id:
-                split_5_glimmer_count += 1
-            if "Sparkle" in reveal_effect_def_id:
-                split_5_sparkle_count += 1
-
-        # Split 6 specific counts
-        if card_counts[card_name] == 6:
-            split_6_total += 1
-            if "Foil" in surface_effect_def_id and "PrismFoil" not in surface_effect_def_id and "GoldFoil" not in surface_effect_def_id:
-                split_6_foil_count += 1
-            if "PrismFoil" in surface_effect_def_id:
-                split_6_prism_count += 1
-            if "Ink" in surface_effect_def_id:
-                split_6_ink_count += 1
-            if "GoldFoil" in surface_effect_def_id:
-                split_6_gold_count += 1
-            if "Comic" in reveal_effect_def_id:
-                split_6_comic_count += 1
-            if "Glimmer" in reveal_effect_def_id:
-                split_6_glimmer_count += 1
-            if "Sparkle" in reveal_effect_def_id:
-                split_6_sparkle_count += 1
-            if "Kirby" in reveal_effect_def_id:
-                split_6_kirby_count += 1
-
-    # Calculate percentages
-    def calculate_percentage(part, whole):
-        return (part / whole) * 100 if whole > 0 else 0
-
-    # General statistics
-    ink_hits_percentage = calculate_percentage(ink_hits, ink_rolls)
-    gold_hits_percentage = calculate_percentage(gold_hits, gold_rolls)
-    kirby_hits_percentage = calculate_percentage(kirby_hits, kirby_rolls)
-    sparkle_hits_percentage = calculate_percentage(sparkle_hits, gold_rolls)
-    comic_hits_percentage = calculate_percentage(comic_hits, comic_glimmer_rolls)
-    glimmer_hits_percentage = calculate_percentage(glimmer_hits, comic_glimmer_rolls)
-
-    # Split 2-3 statistics
-    split_2_3_foil_percentage = calculate_percentage(split_2_3_foil_count, split_2_3_total)
-    split_2_3_prism_percentage = calculate_percentage(split_2_3_prism_count, split_2_3_total)
-    split_2_3_comic_percentage = calculate_percentage(split_2_3_comic_count, split_2_3_total)
-    split_2_3_glimmer_percentage = calculate_percentage(split_2_3_glimmer_count, split_2_3_total)
-
-    # Split 4 statistics
-    split_4_foil_percentage = calculate_percentage(split_4_foil_count, split_4_total)
-    split_4_prism_percentage = calculate_percentage(split_4_prism_count, split_4_total)
-    split_4_ink_percentage = calculate_percentage(split_4_ink_count, split_4_total)
-    split_4_comic_percentage = calculate_percentage(split_4_comic_count, split_4_total)
-    split_4_glimmer_percentage = calculate_percentage(split_4_glimmer_count, split_4_total)
-    split_4_sparkle_percentage = calculate_percentage(split_4_sparkle_count, split_4_total)
-
-    # Split 5 statistics
-    split_5_foil_percentage = calculate_percentage(split_5_foil_count, split_5_total)
-    split_5_prism_percentage = calculate_percentage(split_5_prism_count, split_5_total)
-    split_5_ink_percentage = calculate_percentage(split_5_ink_count, split_5_total)
-    split_5_gold_percentage = calculate_percentage(split_5_gold_count, split_5_total)
-    split_5_comic_percentage = calculate_percentage(split_5_comic_count, split_5_total)
-    split_5_glimmer_percentage = calculate_percentage(split_5_glimmer_count, split_5_total)
-    split_5_sparkle_percentage = calculate_percentage(split_5_sparkle_count, split_5_total)
-
-    # Split 6 statistics
-    split_6_foil_percentage = calculate_percentage(split_6_foil_count, split_6_total)
-    split_6_prism_percentage = calculate_percentage(split_6_prism_count, split_6_total)
-    split_6_ink_percentage = calculate_percentage(split_6_ink_count, split_6_total)
-    split_6_gold_percentage = calculate_percentage(split_6_gold_count, split_6_total)
-    split_6_comic_percentage = calculate_percentage(split_6_comic_count, split_6_total)
-    split_6_glimmer_percentage = calculate_percentage(split_6_glimmer_count, split_6_total)
-    split_6_sparkle_percentage = calculate_percentage(split_6_sparkle_count, split_6_total)
-    split_6_kirby_percentage = calculate_percentage(split_6_kirby_count, split_6_total)
-
-    # Write statistics to file
-    with open(output_file, 'w', encoding='utf-8') as outfile:
-        outfile.write(f"Total Splits: {total_splits}\n")
-        outfile.write("-\n")
-        outfile.write(f"Foil hits: {foil_hits}\n")
-        outfile.write(f"Prism hits: {prism_hits}\n")
-        outfile.write(f"Ink hits: {ink_hits} ({ink_hits_percentage:.2f}%)\n")
-        outfile.write(f"Gold hits: {gold_hits} ({gold_hits_percentage:.2f}%)\n")
-        outfile.write("-\n")
-        outfile.write(f"Ink Rolls: {ink_rolls}\n")
-        outfile.write(f"Gold Rolls: {gold_rolls}\n")
-        outfile.write("-\n")
-        outfile.write(f"Comic hits: {comic_hits} ({comic_hits_percentage:.2f}%)\n")
-        outfile.write(f"Glimmer hits: {glimmer_hits} ({glimmer_hits_percentage:.2f}%)\n")
-        outfile.write(f"Sparkle hits: {sparkle_hits} ({sparkle_hits_percentage:.2f}%)\n")
-        outfile.write(f"Kirby hits: {kirby_hits} ({kirby_hits_percentage:.2f}%)\n")
-        outfile.write("-\n")
-        outfile.write(f"Comic & Glimmer Rolls: {comic_glimmer_rolls}\n")
-        outfile.write(f"Kirby Rolls: {kirby_rolls}\n")
-        outfile.write("-\n")
-        outfile.write(f"Split 2-3\nTotal: {split_2_3_total}\n")
-        outfile.write(f"Foil count: {split_2_3_foil_count} ({split_2_3_foil_percentage:.2f}%)\n")
-        outfile.write(f"Prism count: {split_2_3_prism_count} ({split_2_3_prism_percentage:.2f}%)\n")
-        outfile.write(f"Glimmer count: {split_2_3_glimmer_count} ({split_2_3_glimmer_percentage:.2f}%)\n")
-        outfile.write(f"Comic count: {split_2_3_comic_count} ({split_2_3_comic_percentage:.2f}%)\n")
-        outfile.write("-\n")
-        outfile.write(f"Split 4\nTotal: {split_4_total}\n")
-        outfile.write(f"Foil count: {split_4_foil_count} ({split_4_foil_percentage:.2f}%)\n")
-        outfile.write(f"Prism count: {split_4_prism_count} ({split_4_prism_percentage:.2f}%)\n")
-        outfile.write(f"Ink count: {split_4_ink_count} ({split_4_ink_percentage:.2f}%)\n")
-        outfile.write(f"Glimmer count: {split_4_glimmer_count} ({split_4_glimmer_percentage:.2f}%)\n")
-        outfile.write(f"Comic count: {split_4_comic_count} ({split_4_comic_percentage:.2f}%)\n")
-        outfile.write(f"Sparkle count: {split_4_sparkle_count} ({split_4_sparkle_percentage:.2f}%)\n")
-        outfile.write("-\n")
-        outfile.write(f"Split 5\nTotal: {split_5_total}\n")
-        outfile.write(f"Foil count: {split_5_foil_count} ({split_5_foil_percentage:.2f}%)\n")
-        outfile.write(f"Prism count: {split_5_prism_count} ({split_5_prism_percentage:.2f}%)\n")
-        outfile.write(f"Ink count: {split_5_ink_count} ({split_5_ink_percentage:.2f}%)\n")
-        outfile.write(f"Gold count: {split_5_gold_count} ({split_5_gold_percentage:.2f}%)\n")
-        outfile.write(f"Glimmer count: {split_5_glimmer_count} ({split_5_glimmer_percentage:.2f}%)\n")
-        outfile.write(f"Comic count: {split_5_comic_count} ({split_5_comic_percentage:.2f}%)\n")
-        outfile.write(f"Sparkle count: {split_5_sparkle_count} ({split_5_sparkle_percentage:.2f}%)\n")
-        outfile.write("-\n")
-        outfile.write(f"Split 6\nTotal: {split_6_total}\n")
-        outfile.write(f"Foil count: {split_6_foil_count} ({split_6_foil_percentage:.2f}%)\n")
-        outfile.write(f"Prism count: {split_6_prism_count} ({split_6_prism_percentage:.2f}%)\n")
-        outfile.write(f"Ink count: {split_6_ink_count} ({split_6_ink_percentage:.2f}%)\n")
-        outfile.write(f"Gold count: {split_6_gold_count} ({split_6_gold_percentage:.2f}%)\n")
-        outfile.write(f"Glimmer count: {split_6_glimmer_count} ({split_6_glimmer_percentage:.2f}%)\n")
-        outfile.write(f"Comic count: {split_6_comic_count} ({split_6_comic_percentage:.2f}%)\n")
-        outfile.write(f"Sparkle count: {split_6_sparkle_count} ({split_6_sparkle_percentage:.2f}%)\n")
-        outfile.write(f"Kirby count: {split_6_kirby_count} ({split_6_kirby_percentage:.2f}%)\n")
+            added.append(new_fingerprint)
+            new_index += 1
+    removed.extend(old[old_index:])
+    added.extend(new[new_index:])
+    return added, removed
+
+def splits_with_fingerprints(table, table_fingerprints, wanted):
+    """Return the table's splits whose fingerprint is in wanted, in chronological order."""
+    remaining = Counter(wanted)
+    positions = []
+    for position, fingerprint in enumerate(table_fingerprints):
+        if remaining[fingerprint] > 0:
+            remaining[fingerprint] -= 1
+            positions.append(position)
+    strings = table.pool.strings
+    return [Split(strings[table.card_codes[position]], strings[table.surface_codes[position]],
+                  strings[table.reveal_codes[position]], table.time_created(position))
+            for position in positions]
+
+def statistic_changes(old, new, path=()):
+    """Return {key path: change} for every value that differs between two SplitStatistics.to_dict() results.
+
+    Nested dicts are walked down to their values. A number changes by the
+    difference, counting as 0 where it is missing, anything else (the cards
+    of a streak) by its new value.
+    """
+    changes = {}
+    for key in {**old, **new}:
+        old_value, new_value = old.get(key), new.get(key)
+        if isinstance(old_value, dict) or isinstance(new_value, dict):
+            changes.update(statistic_changes(old_value or {}, new_value or {}, path + (key,)))
+        elif isinstance(old_value if new_value is None else new_value, (int, float)):
+            change = (new_value or 0) - (old_value or 0)
+            if change:
+                changes[path + (key,)] = change
+        elif old_value != new_value:
+            changes[path + (key,)] = new_value
+    return changes
+
+def diff_snapshots(table, old):
+    """Find the splits added and removed since an older snapshot, and the change in every statistic.
+
+    old is either an older SplitTable or the (fingerprints, statistics) from
+    read_fingerprints. A fingerprint file only knows how many splits were
+    removed, not which, so 'removed' is then a count rather than a list of
+    splits. The changes cover everything SplitStatistics.to_dict() holds,
+    the stored statistics standing in for an old snapshot that isn't
+    analyzed again.
+    """
+    fingerprints = split_fingerprints(table)
+    if isinstance(old, SplitTable):
+        old_table = old
+        old_fingerprints = split_fingerprints(old)
+        old_statistics = analyze_splits(old).to_dict()
+    else:
+        old_table = None
+        old_fingerprints, old_statistics = old
+    added, removed = diff_fingerprints(sorted(old_fingerprints), sorted(fingerprints))
+
+    stats = analyze_splits(table)
+    return {
+        'fingerprints': fingerprints,
+        'stats': stats,
+        'added': splits_with_fingerprints(table, fingerprints, added),
+        'removed': splits_with_fingerprints(old_table, old_fingerprints, removed) if old_table is not None else len(removed),
+        'changes': statistic_changes(old_statistics, stats.to_dict()),
+    }
 
-    print(f"Statistics written to {output_file}")
+def change_label(path):
+    """Name a statistic_changes key path the way diff.txt shows it, e.g. Split Tiers 2-3 Foil."""
+    return ' '.join(part.replace('_', ' ').title() if part.islower() else part for part in path)
 
-def additional_stats(input_file):
-    cards = parse_output_file(input_file)
-    card_luck, card_rolls = calculate_luck(cards)
-    streaks = find_streaks(cards, card_rolls)
-    longest_ink_drought, longest_gold_drought, longest_kirby_drought = track_droughts(cards)
+def write_diff(diff, output_file=DIFF_PATH):
+    """Export a diff_snapshots result: the added and removed splits in rawlist.txt form, then every change."""
+    try:
+        with open(output_file, 'w', encoding='utf-8') as outfile:
+            outfile.writelines(f"+ {split[0]} {split[1]} {split[2]} {split[3]}\n" for split in diff['added'])
+            if isinstance(diff['removed'], int):
+                if diff['removed']:
+                    outfile.write(f"- {diff['removed']} splits are no longer in the collection\n")
+            else:
+                outfile.writelines(f"- {split[0]} {split[1]} {split[2]} {split[3]}\n" for split in diff['removed'])
+
+            outfile.write("\nChanges:\n")
+            card_changes = {}
+            for path, change in diff['changes'].items():
+                if path[0] == 'card_counts':
+                    card_changes[path[1]] = change
+                elif isinstance(change, list):
+                    outfile.write(f"{change_label(path)}: {', '.join(change) or 'none'}\n")
+                else:
+                    outfile.write(f"{change_label(path)}: {change:+}\n")
+            outfile.write("\nSplits per card:\n")
+            card_counts = diff['stats'].card_counts
+            for card_def_id, change in sorted(card_changes.items()):
+                outfile.write(f"{card_def_id}: {change:+d} ({card_counts.get(card_def_id, 0)} total)\n")
+
+        print(f"Diff written to {output_file}")
+        return True
+    except IOError as e:
+        print(f"Error: IOError - {e}")
+        return False
+
+def run_diff(file_path, old_path=FINGERPRINT_PATH, fingerprint_path=FINGERPRINT_PATH, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES):
+    """Diff the collection against an older CollectionState.json or saved fingerprints, then save its own fingerprints.
+
+    Returns the diff_snapshots result, or None if there was nothing to compare with.
+    """
+    with METRICS.stage('load_collection'):
+        table = load_collection(file_path, cache_dir, cache_max_bytes)
+    if table is None:
+        return None
+
+    old = None
+    if os.path.exists(old_path):
+        old = read_fingerprints(old_path)
+        if old == ():
+            print(f"{old_path} was saved by an incompatible version")
+            old = None
+        elif old is None:
+            with METRICS.stage('load_old_collection'):
+                old = load_collection(old_path, cache_dir, cache_max_bytes)
+            if old is None:
+                return None
+
+    diff = None
+    if old is None:
+        print(f"No earlier snapshot found at {old_path}, saving this one to compare against next time")
+        with METRICS.stage('fingerprints'):
+            fingerprints = split_fingerprints(table)
+            stats = analyze_splits(table)
+    else:
+        with METRICS.stage('diff_snapshots'):
+            diff = diff_snapshots(table, old)
+        fingerprints, stats = diff['fingerprints'], diff['stats']
+        removed = diff['removed'] if isinstance(diff['removed'], int) else len(diff['removed'])
+        print(f"{len(diff['added'])} new splits, {removed} removed since the last snapshot")
+        write_diff(diff)
+
+    with METRICS.stage('write_fingerprints'):
+        write_fingerprints(fingerprint_path, fingerprints, stats)
+    return diff
+
+def export_format(path):
+    """The export format EXPORT_FORMATS gives a path's extension, or None."""
+    return EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+
+def export_schema():
+    """Describe the split export columns and the bits of its flags column, as saved next to CSV and NDJSON exports."""
+    return {
+        'columns': [{'name': name, 'type': kind, 'nullable': nullable} for name, kind, nullable in EXPORT_COLUMNS],
+        'flag_bits': FLAG_BITS,
+    }
+
+@lru_cache(maxsize=None)
+def export_effects(mask):
+    """The effect columns of a split export for a split's flags, one bool per effect rule."""
+    return tuple(bool(mask & rule.flag) for rule in EFFECT_RULES)
+
+def export_batches(table, batch_size=EXPORT_BATCH_SIZE):
+    """Yield a SplitTable's columns batch_size splits at a time, in table order.
+
+    Each batch is a tuple of lists: card, surface and reveal codes, epoch
+    microsecond times, split numbers and effect flags. The split numbers
+    and flags are worked out for the whole table once, vectorized when
+    NumPy is installed.
+    """
+    split_numbers = table_split_numbers(table)
+    masks = table_masks(table)
+    for start in range(0, len(table), batch_size):
+        stop = start + batch_size
+        numbers = split_numbers[start:stop]
+        flags = masks[start:stop]
+        if np is not None:
+            numbers = numbers.tolist()
+            flags = flags.tolist()
+        yield (table.card_codes[start:stop].tolist(), table.surface_codes[start:stop].tolist(),
+               table.reveal_codes[start:stop].tolist(), table.times[start:stop].tolist(), numbers, flags)
+
+def csv_field(string):
+    """Quote a CSV field if it needs it."""
+    if any(char in string for char in ',"\r\n'):
+        return '"' + string.replace('"', '""') + '"'
+    return string
+
+def write_csv_export(table, output_file, batch_size=EXPORT_BATCH_SIZE):
+    """Write every split to a CSV file with a header row, one batch of lines per write.
+
+    Null reveal effects and times are left empty, times are written in the
+    TimeCreated format and effects as true or false. Every string in the
+    pool and every set of flags is encoded once.
+    """
+    encoded = [csv_field(string) for string in table.pool.strings]
+    effect_fields = {}
+    with open(output_file, 'w', encoding='utf-8', newline='') as file:
+        file.write(','.join(name for name, _, _ in EXPORT_COLUMNS) + '\r\n')
+        for cards, surfaces, reveals, times, numbers, masks in export_batches(table, batch_size):
+            lines = []
+            for card, surface, reveal, epoch_us, number, mask in zip(cards, surfaces, reveals, times, numbers, masks):
+                effects = effect_fields.get(mask)
+                if effects is None:
+                    effects = effect_fields[mask] = ''.join(',true' if hit else ',false' for hit in export_effects(mask))
+                lines.append(f"{encoded[card]},{encoded[surface]},{encoded[reveal]},{format_time_created(epoch_us)},{number},{mask}{effects}\r\n")
+            file.write(''.join(lines))
+
+def write_ndjson_export(table, output_file, batch_size=EXPORT_BATCH_SIZE):
+    """Write every split to a newline-delimited JSON file, one object per split with the EXPORT_COLUMNS keys.
+
+    Every string in the pool and every set of flags is encoded once, and
+    each batch is joined into a single write.
+    """
+    encoded = [json.dumps(string) for string in table.pool.strings]
+    reveal_encoded = [value if string else 'null' for string, value in zip(table.pool.strings, encoded)]
+    effect_names = [name for name, kind, _ in EXPORT_COLUMNS if kind == 'bool']
+    effect_fields = {}
+    with open(output_file, 'w', encoding='utf-8') as file:
+        for cards, surfaces, reveals, times, numbers, masks in export_batches(table, batch_size):
+            lines = []
+            for card, surface, reveal, epoch_us, number, mask in zip(cards, surfaces, reveals, times, numbers, masks):
+                effects = effect_fields.get(mask)
+                if effects is None:
+                    effects = effect_fields[mask] = ''.join(f',"{name}":{"true" if hit else "false"}'
+                                                            for name, hit in zip(effect_names, export_effects(mask)))
+                time_created = 'null' if epoch_us == MISSING_TIME else f'"{format_time_created(epoch_us)}"'
+                lines.append(f'{{"card_def_id":{encoded[card]},"surface_effect_def_id":{encoded[surface]},'
+                             f'"reveal_effect_def_id":{reveal_encoded[reveal]},"time_created":{time_created},'
+                             f'"split_number":{number},"flags":{mask}{effects}}}\n')
+            file.write(''.join(lines))
+
+def arrow_export_schema():
+    """The Arrow schema of a split export, with the strings dictionary encoded and the flag bits in its metadata."""
+    types = {'string': pa.dictionary(pa.int32(), pa.string()), 'timestamp[us, UTC]': pa.timestamp('us', tz='UTC'),
+             'int32': pa.int32(), 'bool': pa.bool_()}
+    return pa.schema([pa.field(name, types[kind], nullable) for name, kind, nullable in EXPORT_COLUMNS],
+                     metadata={'flag_bits': json.dumps(FLAG_BITS)})
+
+def write_arrow_export(table, output_file, batch_size=EXPORT_BATCH_SIZE):
+    """Write every split to an Arrow IPC file, one record batch per batch_size splits. Needs pyarrow.
+
+    The card, surface and reveal columns index the table's string pool as a
+    shared dictionary, so no strings are copied per split.
+    """
+    schema = arrow_export_schema()
+    dictionary = pa.array(table.pool.strings, pa.string())
+    no_reveal = table.pool.codes.get('')
+    missing_time = pa.scalar(None, pa.int64())
+    with pa.OSFile(output_file, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for cards, surfaces, reveals, times, numbers, masks in export_batches(table, batch_size):
+            reveal_codes = pa.array(reveals, pa.int32())
+            if no_reveal is not None:
+                reveal_codes = pc.if_else(pc.equal(reveal_codes, no_reveal), pa.scalar(None, pa.int32()), reveal_codes)
+            epoch_us = pa.array(times, pa.int64())
+            epoch_us = pc.if_else(pc.equal(epoch_us, MISSING_TIME), missing_time, epoch_us)
+            flags = pa.array(masks, pa.int32())
+            columns = [pa.DictionaryArray.from_arrays(pa.array(cards, pa.int32()), dictionary),
+                       pa.DictionaryArray.from_arrays(pa.array(surfaces, pa.int32()), dictionary),
+                       pa.DictionaryArray.from_arrays(reveal_codes, dictionary),
+                       epoch_us.cast(schema.field('time_created').type),
+                       pa.array(numbers, pa.int32()), flags]
+            columns += [pc.not_equal(pc.bit_wise_and(flags, rule.flag), 0) for rule in EFFECT_RULES]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+def write_export(table, output_file, batch_size=EXPORT_BATCH_SIZE):
+    """Export every split to output_file as CSV, NDJSON or Arrow IPC, picked by its extension.
+
+    CSV and NDJSON exports have their schema saved next to them as
+    <name>.schema.json, Arrow files carry their own. Returns True if the
+    export was written.
+    """
+    export = export_format(output_file)
+    if export == 'arrow' and pa is None:
+        print(f"Skipping {output_file}: Arrow exports need pyarrow (pip install pyarrow)")
+        return False
+
+    writers = {'csv': write_csv_export, 'ndjson': write_ndjson_export, 'arrow': write_arrow_export}
+    try:
+        writers[export](table, output_file, batch_size)
+        if export != 'arrow':
+            with open(f"{os.path.splitext(output_file)[0]}.{EXPORT_SCHEMA_SUFFIX}", 'w', encoding='utf-8') as file:
+                json.dump(export_schema(), file, indent=2)
+    except IOError as e:
+        print(f"Error: IOError - {e}")
+        return False
+
+    print(f"Splits exported to {output_file}")
+    return True
 
-    luckiest_card = format_card_name(max(card_luck, key=card_luck.get))
-    unluckiest_card = format_card_name(min(card_luck, key=card_luck.get))
+def calculate_percentage(part, whole):
+    return (part / whole) * 100 if whole > 0 else 0
 
-    longest_ink_drought = (format_card_name(longest_ink_drought[0]), longest_ink_drought[1])
-    longest_gold_drought = (format_card_name(longest_gold_drought[0]), longest_gold_drought[1])
-    longest_kirby_drought = (format_card_name(longest_kirby_drought[0]), longest_kirby_drought[1])
+def write_statistics(stats, output_file, time_index=None):
+    """Write the statistics.txt report, ending with monthly trends when given the collection's TimeIndex.
 
-    return luckiest_card, unluckiest_card, streaks, longest_ink_drought, longest_gold_drought, longest_kirby_drought
+    The hits and rolls come from EFFECT_RULES: each field's hits, with the
+    rate for effects that have rolls, then the rolls counters that field
+    is first to use, named after its effects sharing them.
+    """
+    with open(output_file, 'w', encoding='utf-8') as outfile:
+        outfile.write(f"Total Splits: {stats.total_splits}\n")
+        outfile.write("-\n")
+        written_rolls = set()
+        for field in dict.fromkeys(rule.field for rule in EFFECT_RULES):
+            rules = [rule for rule in EFFECT_RULES if rule.field == field]
+            for rule in rules:
+                hits = getattr(stats, rule.hits)
+                if rule.rolls is None:
+                    outfile.write(f"{rule.name} hits: {hits}\n")
+                else:
+                    outfile.write(f"{rule.name} hits: {hits} ({calculate_percentage(hits, getattr(stats, rule.rolls)):.2f}%)\n")
+            outfile.write("-\n")
+            for rolls in dict.fromkeys(rule.rolls for rule in rules if rule.rolls is not None):
+                if rolls not in written_rolls:
+                    written_rolls.add(rolls)
+                    names = " & ".join(rule.name for rule in rules if rule.rolls == rolls)
+                    outfile.write(f"{names} Rolls: {getattr(stats, rolls)}\n")
+            outfile.write("-\n")
+        for index, (label, _, effects) in enumerate(SPLIT_TIERS):
+            tier = stats.split_tiers[label]
+            if index:
+                outfile.write("-\n")
+            outfile.write(f"Split {label}\nTotal: {tier['Total']}\n")
+            for effect in effects:
+                percentage = calculate_percentage(tier[effect], tier["Total"])
+                outfile.write(f"{effect} count: {tier[effect]} ({percentage:.2f}%)\n")
+
+        months = time_index.monthly() if time_index is not None else []
+        if months:
+            outfile.write("-\nMonthly Trends\n")
+        for label, counts in months:
+            rates = ', '.join(f"{name} {counts[hits]}/{counts[rolls]} ({calculate_percentage(counts[hits], counts[rolls]):.2f}%)"
+                              for name, hits, rolls in TREND_RATES)
+            outfile.write(f"{label}: {counts['splits']} splits, {rates}\n")
+
+    print(f"Statistics written to {output_file}")
+
+def analyze_statistics(input_file, output_file):
+    """Analyze the card information and generate statistics."""
+    table = SplitTable.from_records(parse_output_file(input_file))
+    write_statistics(analyze_splits(table), output_file, TimeIndex(table))
 
 def parse_output_file(file_path):
+    """Read Split records back from an exported rawlist.txt."""
     cards = []
     with open(file_path, 'r') as file:
         for line in file:
@@ -377,232 +2426,51 @@ def parse_output_file(file_path):
                 card_def_id, surface_effect_def_id, reveal_effect_def_id, time_created = parts
             else:
                 continue  # Skip lines that don't match the expected format
-            cards.append((card_def_id, surface_effect_def_id, reveal_effect_def_id, time_created))
+            cards.append(Split(card_def_id, surface_effect_def_id, reveal_effect_def_id, time_created))
     return cards
 
 def is_valid_date(date_str):
-    try:
-        datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        return True
-    except ValueError:
-        return False
-
-def calculate_luck(cards):
-    card_luck = {}
-    card_rolls = {}
-    for card in cards:
-        card_def_id = card[0]
-        reveal_effect_def_id = card[2]
-        surface_effect_def_id = card[1]
-        
-        if card_def_id not in card_rolls:
-            card_rolls[card_def_id] = 0
-        card_rolls[card_def_id] += 1
-
-        if card_def_id not in card_luck:
-            card_luck[card_def_id] = 0
-
-        # Calculate expected rolls
-        roll_number = card_rolls[card_def_id]
-        if roll_number >= 4:
-            card_luck[card_def_id] -= 1  # Negative for every possible roll
-        if roll_number >= 6:
-            card_luck[card_def_id] -= 1  # Additional negative for Kirby roll
-
-        # Calculate actual outcomes
-        if "Ink" in surface_effect_def_id:
-            card_luck[card_def_id] += 5  # Positive for hitting Ink
-        if "Gold" in surface_effect_def_id:
-            card_luck[card_def_id] += 5  # Positive for hitting Gold
-        if "Kirby" in reveal_effect_def_id:
-            card_luck[card_def_id] += 5  # Positive for hitting Kirby
-        if "Ink" in surface_effect_def_id and "Kirby" in reveal_effect_def_id:
-            card_luck[card_def_id] += 5  # Additional bonus for both
-        if "Gold" in surface_effect_def_id and "Kirby" in reveal_effect_def_id:
-            card_luck[card_def_id] += 5  # Additional bonus for both
-
-    return card_luck, card_rolls
+    return parse_time_created(date_str) != MISSING_TIME
 
 def format_card_name(card_name):
     return re.sub(r'(?<!^)(?=[A-Z])', ' ', card_name)
 
-def track_droughts(cards):
-    card_stats = {}
-
-    for card in cards:
-        card_def_id = card[0]
-        surface_effect_def_id = card[1]
-        reveal_effect_def_id = card[2]
-
-        if card_def_id not in card_stats:
-            card_stats[card_def_id] = {
-                "Eligibility counter": 1,
-                "Ink Drought": 0,
-                "Max Ink Drought": 0,
-                "Gold Drought": 0,
-                "Max Gold Drought": 0,
-                "Kirby Drought": 0,
-                "Max Kirby Drought": 0,
-            }
-        else:
-            card_stats[card_def_id]["Eligibility counter"] += 1
-
-        # Ink Drought
-        if card_stats[card_def_id]["Eligibility counter"] >= 4:
-            if "Ink" not in surface_effect_def_id:
-                card_stats[card_def_id]["Ink Drought"] += 1
-                if card_stats[card_def_id]["Ink Drought"] > card_stats[card_def_id]["Max Ink Drought"]:
-                    card_stats[card_def_id]["Max Ink Drought"] = card_stats[card_def_id]["Ink Drought"]
-            else:
-                card_stats[card_def_id]["Ink Drought"] = 0
-
-        # Gold Drought
-        if card_stats[card_def_id]["Eligibility counter"] >= 5:
-            if "Gold" not in surface_effect_def_id:
-                card_stats[card_def_id]["Gold Drought"] += 1
-                if card_stats[card_def_id]["Gold Drought"] > card_stats[card_def_id]["Max Gold Drought"]:
-                    card_stats[card_def_id]["Max Gold Drought"] = card_stats[card_def_id]["Gold Drought"]
-            else:
-                card_stats[card_def_id]["Gold Drought"] = 0
-
-        # Kirby Drought
-        if card_stats[card_def_id]["Eligibility counter"] >= 6:
-            if "Kirby" not in reveal_effect_def_id:
-                card_stats[card_def_id]["Kirby Drought"] += 1
-                if card_stats[card_def_id]["Kirby Drought"] > card_stats[card_def_id]["Max Kirby Drought"]:
-                    card_stats[card_def_id]["Max Kirby Drought"] = card_stats[card_def_id]["Kirby Drought"]
-            else:
-                card_stats[card_def_id]["Kirby Drought"] = 0
-
-    longest_ink_drought = max(card_stats.items(), key=lambda x: x[1]["Max Ink Drought"])
-    longest_gold_drought = max(card_stats.items(), key=lambda x: x[1]["Max Gold Drought"])
-    longest_kirby_drought = max(card_stats.items(), key=lambda x: x[1]["Max Kirby Drought"])
-
-    return longest_ink_drought, longest_gold_drought, longest_kirby_drought
-
-def find_streaks(cards, card_rolls):
-    streaks = {
-        "highest_ink_streak": {"length": 0, "cards": []},
-        "highest_gold_streak": {"length": 0, "cards": []},
-        "highest_kirby_streak": {"length": 0, "cards": []}
-    }
-
-    current_streak = {
-        "ink": [],
-        "gold": [],
-        "kirby": []
-    }
-
-    for card in cards:
-        card_def_id = format_card_name(card[0])
-        reveal_effect_def_id = card[2]
-        surface_effect_def_id = card[1]
-        roll_number = card_rolls[card[0]]
-
-        # Handle ink streaks
-        if "Ink" in surface_effect_def_id:
-            current_streak["ink"].append(card_def_id)
-            if len(current_streak["ink"]) > streaks["highest_ink_streak"]["length"]:
-                streaks["highest_ink_streak"] = {"length": len(current_streak["ink"]), "cards": current_streak["ink"]}
-        else:
-            current_streak["ink"] = []
-
-        # Handle gold streaks
-        if "Gold" in surface_effect_def_id:
-            current_streak["gold"].append(card_def_id)
-            if len(current_streak["gold"]) > streaks["highest_gold_streak"]["length"]:
-                streaks["highest_gold_streak"] = {"length": len(current_streak["gold"]), "cards": current_streak["gold"]}
-        else:
-            current_streak["gold"] = []
-
-        # Handle kirby streaks
-        if "Kirby" in reveal_effect_def_id:
-            current_streak["kirby"].append(card_def_id)
-            if len(current_streak["kirby"]) > streaks["highest_kirby_streak"]["length"]:
-                streaks["highest_kirby_streak"] = {"length": len(current_streak["kirby"]), "cards": current_streak["kirby"]}
-        else:
-            current_streak["kirby"] = []
+def render_html_summary(stats):
+    """Build the summary.html report as a string."""
+    total_splits = stats.total_splits
+    ink_rolls = stats.ink_rolls
+    gold_rolls = stats.gold_rolls
+    krackle_rolls = stats.kirby_rolls
+    ink_hits = stats.all_ink_hits
+    gold_hits = stats.all_gold_hits
+    krackle_hits = stats.all_kirby_hits
+    ink_krackle_hits = stats.ink_kirby_hits
+    gold_krackle_hits = stats.gold_kirby_hits
 
-    return streaks
+    # Every ranked section comes from the leaderboards, three entries deep for the most split cards
+    leaderboards = Leaderboards.from_statistics(stats, SUMMARY_TOP_CARDS)
 
-def generate_html_summary(input_file, output_file):
-    """Generate HTML summary."""
-    # Read the input file
-    with open(input_file, 'r') as file:
-        lines = file.readlines()
-
-    # Dictionary to count occurrences of each card
-    card_counts = {}
-    total_splits = 0
-    ink_hits = 0
-    gold_hits = 0
-    krackle_hits = 0
-    ink_krackle_hits = 0
-    gold_krackle_hits = 0
-
-    # Dictionary to count color occurrences
-    color_counts = {
-        "Black": 0,
-        "Gold": 0,
-        "Green": 0,
-        "Blue": 0,
-        "Red": 0,
-        "White": 0,
-        "Purple": 0,
-        "Rainbow": 0
-    }
+    def best(board, default):
+        ranked = leaderboards.boards[board].items()
+        return ranked[0] if ranked else default
 
-    for line in lines:
-        total_splits += 1
-        parts = line.split()
-        card_name = parts[0]
-
-        if card_name in card_counts:
-            card_counts[card_name] += 1
-        else:
-            card_counts[card_name] = 1
-
-        # Check for additional criteria
-        if "Ink" in line:
-            ink_hits += 1
-        if "GoldFoil" in line:
-            gold_hits += 1
-        if "Kirby" in line:
-            krackle_hits += 1
-        if "Ink" in line and "Kirby" in line:
-            ink_krackle_hits += 1
-        if "GoldFoil" in line and "Kirby" in line:
-            gold_krackle_hits += 1
-
-        # Check for colors in the reveal effect
-        for color in color_counts.keys():
-            if color in parts[2]:
-                color_counts[color] += 1
-
-    # Calculate Ink Rolls, Gold Rolls, and Krackle Rolls
-    ink_rolls = 0
-    gold_rolls = 0
-    krackle_rolls = 0
-    for count in card_counts.values():
-        if count >= 4:
-            ink_rolls += (count - 3)
-        if count >= 5:
-            gold_rolls += (count - 4)
-        if count >= 6:
-            krackle_rolls += (count - 5)
+    streaks = {key: dict(zip(("length", "cards"), best(f"{name}_streak", (0, [])))) for name, key, _ in STREAK_KEYS}
 
     # Calculate percentages relative to their respective rolls
-    ink_hits_percentage = (ink_hits / ink_rolls) * 100 if ink_rolls > 0 else 0
-    gold_hits_percentage = (gold_hits / gold_rolls) * 100 if gold_rolls > 0 else 0
-    krackle_hits_percentage = (krackle_hits / krackle_rolls) * 100 if krackle_rolls > 0 else 0
-    ink_krackle_hits_percentage = (ink_krackle_hits / krackle_rolls) * 100 if krackle_rolls > 0 else 0
-    gold_krackle_hits_percentage = (gold_krackle_hits / krackle_rolls) * 100 if krackle_rolls > 0 else 0
+    ink_hits_percentage = calculate_percentage(ink_hits, ink_rolls)
+    gold_hits_percentage = calculate_percentage(gold_hits, gold_rolls)
+    krackle_hits_percentage = calculate_percentage(krackle_hits, krackle_rolls)
+    ink_krackle_hits_percentage = calculate_percentage(ink_krackle_hits, krackle_rolls)
+    gold_krackle_hits_percentage = calculate_percentage(gold_krackle_hits, krackle_rolls)
 
     # Sort colors by count in descending order
-    sorted_colors = sorted(color_counts.items(), key=lambda item: item[1], reverse=True)
+    sorted_colors = sorted(stats.color_counts.items(), key=lambda item: item[1], reverse=True)
 
-    # Get additional statistics
-    luckiest_card, unluckiest_card, streaks, longest_ink_drought, longest_gold_drought, longest_kirby_drought = additional_stats(input_file)
+    luckiest_card = format_card_name(best('luckiest', (0, ''))[1])
+    unluckiest_card = format_card_name(best('unluckiest', (0, ''))[1])
+    longest_ink_drought, longest_gold_drought, longest_kirby_drought = (
+        best(f"{name.lower()}_drought", (0, ''))[::-1] for name in ("Ink", "Gold", "Kirby"))
+    streak_cards = {key: ', '.join(format_card_name(card) for card in streak['cards']) for key, streak in streaks.items()}
 
     # Generate HTML content
     html_content = f"""
@@ -625,11 +2493,11 @@ def generate_html_summary(input_file, output_file):
                     <p>{luckiest_card}</p>
                     <br>
                     <p>Highest Ink Streak: {streaks['highest_ink_streak']['length']}</p>
-                    <p class="cards">{', '.join(streaks['highest_ink_streak']['cards'])}</p>
+                    <p class="cards">{streak_cards['highest_ink_streak']}</p>
                     <p>Highest Gold Streak: {streaks['highest_gold_streak']['length']}</p>
-                    <p class="cards">{', '.join(streaks['highest_gold_streak']['cards'])}</p>
+                    <p class="cards">{streak_cards['highest_gold_streak']}</p>
                     <p>Highest Kirby Streak: {streaks['highest_kirby_streak']['length']}</p>
-                    <p class="cards">{', '.join(streaks['highest_kirby_streak']['cards'])}</p>
+                    <p class="cards">{streak_cards['highest_kirby_streak']}</p>
                 </div>
                 <div class="column center">
                     <h2>Statistics</h2>
@@ -647,16 +2515,15 @@ def generate_html_summary(input_file, output_file):
     """
 
     # Get top 3 cards with the most copies
-    sorted_card_counts = sorted(card_counts.items(), key=lambda item: item[1], reverse=True)[:3]
-    for card, count in sorted_card_counts:
+    for count, card in leaderboards.boards['most_split'].items():
         html_content += f"<li>{card} - {count} copies</li>"
 
     html_content += "</ul><h2>Flare Color Breakdown</h2><ul>"
 
     # Add sorted color counts to HTML content
-    total_colors = sum(color_counts.values())
+    total_colors = sum(stats.color_counts.values())
     for color, count in sorted_colors:
-        percentage = (count / total_colors) * 100
+        percentage = calculate_percentage(count, total_colors)
         html_content += f"<li>{color}: {count} ({percentage:.2f}%)</li>"
 
     # Append additional stats to HTML content
@@ -667,18 +2534,23 @@ def generate_html_summary(input_file, output_file):
                     <h2>Your Nemesis:</h2>
                     <p>{unluckiest_card}</p>
                     <br>
-                    <p>Longest Ink drought: {longest_ink_drought[1]['Max Ink Drought']}</p>
-                    <p class="cards">{longest_ink_drought[0]}</p>
-                    <p>Longest Gold drought: {longest_gold_drought[1]['Max Gold Drought']}</p>
-                    <p class="cards">{longest_gold_drought[0]}</p>
-                    <p>Longest Kirby drought: {longest_kirby_drought[1]['Max Kirby Drought']}</p>
-                    <p class="cards">{longest_kirby_drought[0]}</p>
+                    <p>Longest Ink drought: {longest_ink_drought[1]}</p>
+                    <p class="cards">{format_card_name(longest_ink_drought[0])}</p>
+                    <p>Longest Gold drought: {longest_gold_drought[1]}</p>
+                    <p class="cards">{format_card_name(longest_gold_drought[0])}</p>
+                    <p>Longest Kirby drought: {longest_kirby_drought[1]}</p>
+                    <p class="cards">{format_card_name(longest_kirby_drought[0])}</p>
                 </div>
             </div>
         </div>
     </body>
     </html>
     """
+    return html_content
+
+def write_html_summary(stats, output_file):
+    """Write the summary.html report."""
+    html_content = render_html_summary(stats)
 
     # Write HTML content to file
     with open(output_file, 'w', encoding='utf-8') as file:
@@ -686,19 +2558,920 @@ def generate_html_summary(input_file, output_file):
 
     print(f"HTML summary written to {output_file}")
 
+def render_card_table(card_index, significance=None):
+    """Build cards.html, a table of every card's aggregates that sorts by any column when its header is clicked.
+
+    With simulate_significance results, the luck percentile and the
+    p-value of every longest drought are shown too.
+    """
+    headers = ["Card", "Splits", "Luck"] + (["Luck Percentile"] if significance else [])
+    headers += CARD_HIT_EFFECTS + [f"{effect} Drought" for effect, _ in HISTORY_EFFECTS]
+    rows = []
+    for card in card_index.rows():
+        hits = card['hits']
+        droughts = card['droughts']
+        tested = significance['cards'].get(card['card']) if significance else None
+        cells = [(card['card'], format_card_name(card['card'])), (card['splits'], card['splits']), (card['luck'], card['luck'])]
+        if significance:
+            percentile = tested['luck']['percentile'] if tested else 50.0
+            cells.append((f"{percentile:.1f}", f"{percentile:.1f}"))
+        for effect in CARD_HIT_EFFECTS:
+            rolls = card['rolls'].get(effect)
+            cells.append((hits.get(effect, 0), f"{hits.get(effect, 0)}/{rolls}" if rolls is not None else hits.get(effect, 0)))
+        for effect, _ in HISTORY_EFFECTS:
+            current = droughts.get(f"{effect} Drought", 0)
+            longest = droughts.get(f"Max {effect} Drought", 0)
+            p_value = f", p={tested['droughts'][effect]['p_value']:.3f}" if tested else ""
+            cells.append((longest, f"{current} (max {longest}{p_value})"))
+        rows.append("<tr>" + "".join(f'<td data-sort="{html.escape(str(key))}">{html.escape(str(text))}</td>' for key, text in cells) + "</tr>")
+
+    header_cells = "".join(f"<th>{header}</th>" for header in headers)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Card Breakdown</title>
+    <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+    <div class="popup wide">
+        <div class="header">
+            <h1>Card Breakdown</h1>
+        </div>
+        <p class="cards">Hits only count splits that could roll the effect, shown out of those splits for Ink, Gold and Kirby. Droughts count those splits since the last hit. Click a column to sort.</p>
+        <table class="card-table">
+            <thead><tr>{header_cells}</tr></thead>
+            <tbody>
+{chr(10).join(rows)}
+            </tbody>
+        </table>
+    </div>
+    <script>
+    document.querySelectorAll('.card-table th').forEach((header, column) => {{
+        header.addEventListener('click', () => {{
+            const body = header.closest('table').tBodies[0];
+            const descending = header.dataset.order !== 'desc';
+            header.parentNode.querySelectorAll('th').forEach(other => delete other.dataset.order);
+            header.dataset.order = descending ? 'desc' : 'asc';
+            const key = row => {{
+                const value = row.cells[column].dataset.sort;
+                return isNaN(value) ? value : Number(value);
+            }};
+            const rows = Array.from(body.rows).sort((a, b) => {{
+                const x = key(a), y = key(b);
+                return (x < y ? -1 : x > y ? 1 : 0) * (descending ? -1 : 1);
+            }});
+            rows.forEach(row => body.appendChild(row));
+        }});
+    }});
+    </script>
+</body>
+</html>
+"""
+
+def write_card_table(card_index, output_file, significance=None):
+    """Write the cards.html report."""
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(render_card_table(card_index, significance))
+
+    print(f"Card table written to {output_file}")
+
+def report_dataset(table, stats, time_index=None, significance=None, top=LEADERBOARD_SIZE):
+    """Collect everything report.html shows into one compact JSON serializable dict.
+
+    Cards and effects appear as codes into 'strings', the table's own
+    string pool, and per-card and per-split values are stored as columns.
+    Split times are deltas from the previous split, in milliseconds when
+    every time allows it, after the leading splits whose time is missing.
+    """
+    pool = table.pool
+    cards = list(stats.card_counts)
+    card_droughts = [stats.card_droughts.get(card_def_id, {}) for card_def_id in cards]
+    card_hits = [stats.card_hits.get(card_def_id, {}) for card_def_id in cards]
+    card_columns = {
+        'card': [pool.intern(card_def_id) for card_def_id in cards],
+        'splits': [stats.card_counts[card_def_id] for card_def_id in cards],
+        'luck': [stats.card_luck.get(card_def_id, 0) for card_def_id in cards],
+        'hits': {effect: [hits.get(effect, 0) for hits in card_hits] for effect in CARD_HIT_EFFECTS},
+        'first_split': {effect: RULES_BY_NAME[effect].first_split for effect, _ in HISTORY_EFFECTS},
+        'drought': {effect: [droughts.get(f"{effect} Drought", 0) for droughts in card_droughts] for effect, _ in HISTORY_EFFECTS},
+        'max_drought': {effect: [droughts.get(f"Max {effect} Drought", 0) for droughts in card_droughts] for effect, _ in HISTORY_EFFECTS},
+    }
+    if significance:
+        tested = [significance['cards'].get(card_def_id) for card_def_id in cards]
+        card_columns['percentile'] = [card['luck']['percentile'] if card else 50.0 for card in tested]
+        card_columns['drought_p'] = {effect: [card['droughts'][effect]['p_value'] if card else 1.0 for card in tested]
+                                     for effect, _ in HISTORY_EFFECTS}
+
+    times = table.times
+    missing = bisect.bisect_right(times, MISSING_TIME)
+    dated = times[missing:]
+    unit = 1000 if all(epoch_us % 1000 == 0 for epoch_us in dated) else 1
+    scaled = [epoch_us // unit for epoch_us in dated]
+    deltas = [later - earlier for earlier, later in zip([0] + scaled, scaled)]
+
+    months = time_index.monthly() if time_index is not None else []
+    month_columns = {'labels': [label for label, _ in months]}
+    for name in ['splits'] + list(TIME_SERIES):
+        month_columns[name] = [counts[name] for _, counts in months]
+
+    totals = {'total_splits': stats.total_splits}
+    totals.update((name, getattr(stats, name)) for name in TIME_SERIES)
+    totals.update(ink_kirby_hits=stats.ink_kirby_hits, gold_kirby_hits=stats.gold_kirby_hits)
+    return {
+        'strings': pool.strings,
+        'totals': totals,
+        'rates': TREND_RATES,
+        'tiers': [[label, stats.split_tiers[label]] for label, _, _ in SPLIT_TIERS],
+        'colors': stats.color_counts,
+        'leaderboards': Leaderboards.from_statistics(stats, top, table).report(),
+        'months': month_columns,
+        'cards': card_columns,
+        'splits': {
+            'card': table.card_codes.tolist(),
+            'surface': table.surface_codes.tolist(),
+            'reveal': table.reveal_codes.tolist(),
+            'missing_times': missing,
+            'time_unit': unit,
+            'time': deltas,
+        },
+    }
+
+# report.html: a static page that renders whatever report_dataset put in place of __REPORT_DATA__
+REPORT_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Split Report</title>
+    <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+    <div class="popup wide">
+        <div class="header">
+            <h1>Split Report</h1>
+        </div>
+        <div class="tabs">
+            <button data-tab="summary">Summary</button>
+            <button data-tab="months">Months</button>
+            <button data-tab="cards">Cards</button>
+            <button data-tab="splits">Splits</button>
+        </div>
+        <div id="tab-views"></div>
+    </div>
+    <script type="application/json" id="report-data">__REPORT_DATA__</script>
+    <script>
+    const data = JSON.parse(document.getElementById('report-data').textContent);
+    const strings = data.strings;
+    const PAGE_SIZE = 200;
+
+    const percent = (part, whole) => (whole > 0 ? 100 * part / whole : 0).toFixed(2) + '%';
+    const cardName = name => name.replace(/(?<!^)(?=[A-Z])/g, ' ');
+
+    function element(tag, attributes, ...children) {
+        const node = document.createElement(tag);
+        Object.entries(attributes || {}).forEach(([name, value]) => node.setAttribute(name, value));
+        children.forEach(child => node.append(child));
+        return node;
+    }
+
+    function list(title, items) {
+        return [element('h2', null, title), element('ul', null, ...items.map(item => element('li', null, item)))];
+    }
+
+    // A table over rows 0 .. count - 1, sorted by clicking a header, filtered by the text box and shown a page at a time
+    function table(container, columns, count) {
+        const filter = element('input', {type: 'search', placeholder: 'Filter', class: 'filter'});
+        const head = element('tr', null, ...columns.map(column => element('th', null, column.label)));
+        const body = element('tbody');
+        const more = element('button', {class: 'more'}, 'Show more');
+        container.append(filter, element('table', {class: 'card-table'}, element('thead', null, head), body), more);
+
+        const all = Array.from({length: count}, (_, row) => row);
+        let rows = all;
+        let shown = 0;
+        let sortColumn = null;
+        let descending = true;
+
+        function page() {
+            const end = Math.min(rows.length, shown + PAGE_SIZE);
+            const fragment = document.createDocumentFragment();
+            for (let index = shown; index < end; index++) {
+                fragment.append(element('tr', null, ...columns.map(column => element('td', null, String(column.text(rows[index]))))));
+            }
+            body.append(fragment);
+            shown = end;
+            more.hidden = shown >= rows.length;
+        }
+
+        function refresh() {
+            const query = filter.value.trim().toLowerCase();
+            rows = query ? all.filter(row => columns.some(column => String(column.text(row)).toLowerCase().includes(query))) : all.slice();
+            if (sortColumn !== null) {
+                const key = columns[sortColumn].key || columns[sortColumn].text;
+                rows.sort((a, b) => {
+                    const x = key(a), y = key(b);
+                    return (x < y ? -1 : x > y ? 1 : a - b) * (descending ? -1 : 1);
+                });
+            }
+            body.replaceChildren();
+            shown = 0;
+            page();
+        }
+
+        head.querySelectorAll('th').forEach((header, column) => header.addEventListener('click', () => {
+            descending = sortColumn === column ? !descending : true;
+            sortColumn = column;
+            refresh();
+        }));
+        filter.addEventListener('input', refresh);
+        more.addEventListener('click', page);
+        refresh();
+    }
+
+    // Bars for one value per label, scaled to the largest
+    function barChart(labels, values) {
+        const highest = Math.max(1, ...values);
+        return element('div', {class: 'bar-chart'}, ...labels.map((label, index) => element('div', {class: 'bar', title: `${label}: ${values[index]}`},
+            element('span', {style: `height: ${100 * values[index] / highest}%`}))));
+    }
+
+    const renderers = {
+        summary(container) {
+            const totals = data.totals;
+            const statistics = [`Total splits: ${totals.total_splits}`];
+            data.rates.forEach(([name, hits, rolls]) => statistics.push(`${name}: ${totals[hits]}/${totals[rolls]} (${percent(totals[hits], totals[rolls])})`));
+            statistics.push(`Ink & Kirby Hits: ${totals.ink_kirby_hits} (${percent(totals.ink_kirby_hits, totals.kirby_rolls)})`,
+                            `Gold & Kirby Hits: ${totals.gold_kirby_hits} (${percent(totals.gold_kirby_hits, totals.kirby_rolls)})`);
+            const colorTotal = Object.values(data.colors).reduce((sum, count) => sum + count, 0);
+            const colors = Object.entries(data.colors).sort((a, b) => b[1] - a[1]).map(([color, count]) => `${color}: ${count} (${percent(count, colorTotal)})`);
+            const tiers = data.tiers.flatMap(([label, tier]) => list(`Split ${label}: ${tier.Total}`,
+                Object.entries(tier).filter(([effect]) => effect !== 'Total').map(([effect, count]) => `${effect}: ${count} (${percent(count, tier.Total)})`)));
+
+            const entry = value => Array.isArray(value) ? value.map(cardName).join(', ') : cardName(value);
+            const boards = Object.entries(data.leaderboards).flatMap(([name, ranked]) =>
+                list(name.replace('_', ' ').replace(/^./, first => first.toUpperCase()), ranked.map(({value, entry: card}) => `${value}: ${entry(card)}`)));
+
+            container.append(element('div', {class: 'columns'},
+                element('div', {class: 'column left'}, ...boards),
+                element('div', {class: 'column center'}, ...list('Statistics', statistics), ...list('Flare Color Breakdown', colors)),
+                element('div', {class: 'column right'}, ...tiers)));
+        },
+
+        months(container) {
+            const months = data.months;
+            if (!months.labels.length) {
+                container.append(element('p', null, 'No dated splits.'));
+                return;
+            }
+            container.append(element('h2', null, 'Splits per month'), barChart(months.labels, months.splits));
+            const columns = [{label: 'Month', text: row => months.labels[row]}, {label: 'Splits', text: row => months.splits[row]}];
+            data.rates.forEach(([name, hits, rolls]) => columns.push({
+                label: name,
+                text: row => `${months[hits][row]}/${months[rolls][row]} (${percent(months[hits][row], months[rolls][row])})`,
+                key: row => months[rolls][row] ? months[hits][row] / months[rolls][row] : 0,
+            }));
+            table(container, columns, months.labels.length);
+        },
+
+        cards(container) {
+            const cards = data.cards;
+            const columns = [
+                {label: 'Card', text: row => cardName(strings[cards.card[row]])},
+                {label: 'Splits', text: row => cards.splits[row]},
+                {label: 'Luck', text: row => cards.luck[row]},
+            ];
+            if (cards.percentile) {
+                columns.push({label: 'Luck Percentile', text: row => cards.percentile[row].toFixed(1), key: row => cards.percentile[row]});
+            }
+            Object.entries(cards.hits).forEach(([effect, hits]) => {
+                const first = cards.first_split[effect];
+                columns.push(first === undefined ? {label: effect, text: row => hits[row]} : {
+                    label: effect,
+                    text: row => `${hits[row]}/${Math.max(0, cards.splits[row] - first + 1)}`,
+                    key: row => hits[row],
+                });
+            });
+            Object.keys(cards.drought).forEach(effect => columns.push({
+                label: `${effect} Drought`,
+                text: row => `${cards.drought[effect][row]} (max ${cards.max_drought[effect][row]}` +
+                             (cards.drought_p ? `, p=${cards.drought_p[effect][row].toFixed(3)})` : ')'),
+                key: row => cards.max_drought[effect][row],
+            }));
+            container.append(element('p', {class: 'cards'}, 'Hits only count splits that could roll the effect, shown out of those splits for Ink, Gold and Kirby. Droughts count those splits since the last hit.'));
+            table(container, columns, cards.card.length);
+        },
+
+        splits(container) {
+            const splits = data.splits;
+            const count = splits.card.length;
+
+            // Undo the delta encoding and number every card's splits
+            const times = new Array(count).fill(null);
+            let time = 0;
+            for (let row = splits.missing_times; row < count; row++) {
+                time += splits.time[row - splits.missing_times];
+                times[row] = time * splits.time_unit;
+            }
+            const seen = new Map();
+            const numbers = splits.card.map(card => {
+                const number = (seen.get(card) || 0) + 1;
+                seen.set(card, number);
+                return number;
+            });
+            const formatTime = row => times[row] === null ? '' : new Date(times[row] / 1000).toISOString();
+
+            table(container, [
+                {label: '#', text: row => row + 1},
+                {label: 'Card', text: row => strings[splits.card[row]]},
+                {label: 'Split', text: row => numbers[row]},
+                {label: 'Surface', text: row => strings[splits.surface[row]]},
+                {label: 'Reveal', text: row => strings[splits.reveal[row]]},
+                {label: 'Time', text: formatTime, key: row => times[row] === null ? -Infinity : times[row]},
+            ], count);
+        },
+    };
+
+    // Each tab is rendered the first time it is opened
+    const views = {};
+    function show(name) {
+        if (!views[name]) {
+            views[name] = element('div');
+            document.getElementById('tab-views').append(views[name]);
+            renderers[name](views[name]);
+        }
+        Object.entries(views).forEach(([other, view]) => view.hidden = other !== name);
+        document.querySelectorAll('.tabs button').forEach(button => button.classList.toggle('active', button.dataset.tab === name));
+    }
+    document.querySelectorAll('.tabs button').forEach(button => button.addEventListener('click', () => show(button.dataset.tab)));
+    show('summary');
+    </script>
+</body>
+</html>
+"""
+
+def render_report(dataset):
+    """Build report.html from a report_dataset, with the data as one JSON script element."""
+    # Escape "<" so no value can close the script element
+    payload = json.dumps(dataset, separators=(',', ':')).replace('<', '\\u003c')
+    return REPORT_TEMPLATE.replace('__REPORT_DATA__', payload)
+
+def write_report(table, stats, output_file, time_index=None, significance=None):
+    """Write the report.html report."""
+    with open(output_file, 'w', encoding='utf-8') as file:
+        file.write(render_report(report_dataset(table, stats, time_index, significance)))
+
+    print(f"Report written to {output_file}")
+
+def generate_html_summary(input_file, output_file):
+    """Generate HTML summary."""
+    write_html_summary(analyze_splits(parse_output_file(input_file)), output_file)
+
+def find_collection_files(pattern):
+    """Return the CollectionState files in a directory, or matching a glob pattern, in sorted order."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '**', '*.json')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+def batch_output_names(sources):
+    """Give every source file a distinct output name based on its file name."""
+    names = []
+    used = set()
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        name = stem
+        suffix = 2
+        while name in used:
+            name = f"{stem}-{suffix}"
+            suffix += 1
+        used.add(name)
+        names.append(name)
+    return names
+
+def run_pipeline(file_path, rawlist_path=RAWLIST_PATH, statistics_path=STATISTICS_PATH, summary_path=SUMMARY_PATH,
+                 cards_path=CARDS_PATH, incremental=False, checkpoint_path=CHECKPOINT_PATH, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES,
+                 simulations=0, drop_rates=None, jobs=1, significance_path=SIGNIFICANCE_PATH, archive_path=None,
+                 report_path=REPORT_PATH, export_paths=()):
+    """Parse one collection file, analyze it and write every report.
+
+    With simulations, the luck, droughts and streaks are also tested with
+    simulate_significance and the results saved to significance_path.
+    With archive_path, the splits are also added to that history archive.
+    Every path in export_paths gets a write_export of the splits.
+    rawlist.txt is skipped when rawlist_path is None.
+    Large collections are analyzed with analyze_sharded over jobs processes.
+    Returns (splits, stats), or None if the collection could not be read.
+    """
+    with METRICS.stage('load_collection'):
+        splits = load_collection(file_path, cache_dir, cache_max_bytes)
+    if splits is None:
+        return None
+
+    # Export the sorted splits to rawlist.txt
+    if rawlist_path is not None:
+        with METRICS.stage('write_rawlist'):
+            write_rawlist(splits, rawlist_path)
+
+    # Gather every statistic in one pass over the splits
+    with METRICS.stage('analyze_splits'):
+        if incremental:
+            stats = analyze_incremental(splits, file_path, checkpoint_path)
+        elif len(splits) >= SHARD_MIN_SPLITS and (jobs or os.cpu_count() or 1) > 1:
+            stats = analyze_sharded(splits, jobs)
+        else:
+            stats = analyze_splits(splits)
+
+    # Index the roll and hit counters by time for the monthly trends
+    with METRICS.stage('time_index'):
+        time_index = TimeIndex(splits)
+
+    # Generate the statistics
+    with METRICS.stage('write_statistics'):
+        write_statistics(stats, statistics_path, time_index)
+
+    # Generate the summary as HTML
+    with METRICS.stage('write_html_summary'):
+        write_html_summary(stats, summary_path)
+
+    # Test how unusual every card's luck and droughts are
+    significance = None
+    if simulations:
+        with METRICS.stage('simulate_significance'):
+            significance = simulate_significance(stats, simulations, drop_rates, jobs, split_numbers=table_split_numbers(splits))
+        if significance is not None:
+            write_significance(significance, significance_path)
+
+    # Generate the sortable per card table
+    with METRICS.stage('write_card_table'):
+        write_card_table(CardIndex(splits, stats), cards_path, significance)
+
+    # Generate the full report, rendered in the browser from its embedded data
+    with METRICS.stage('write_report'):
+        write_report(splits, stats, report_path, time_index, significance)
+
+    # Export the splits for other tools to load
+    for export_path in export_paths:
+        with METRICS.stage('export_splits'):
+            write_export(splits, export_path)
+
+    # Keep every split in the history archive
+    if archive_path:
+        with METRICS.stage('archive_splits'):
+            write_archive(splits, file_path, archive_path)
+
+    return splits, stats
+
+def process_batch_file(source, output_dir, name, incremental=False, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES,
+                       collect_metrics=False, trace_memory=False, top=LEADERBOARD_SIZE):
+    """Parse and analyze one collection file in a worker, writing outputs prefixed with name.
+
+    Returns the index entry, the SplitStatistics state and the collection's
+    Leaderboards state, top entries deep, or None for both states on failure.
+    """
+    prefix = os.path.join(output_dir, name)
+    outputs = {
+        'rawlist': f"{prefix}.{RAWLIST_PATH}",
+        'statistics': f"{prefix}.{STATISTICS_PATH}",
+        'summary': f"{prefix}.{SUMMARY_PATH}",
+        'cards': f"{prefix}.{CARDS_PATH}",
+        'report': f"{prefix}.{REPORT_PATH}",
+        'state': f"{prefix}.{STATS_STATE_SUFFIX}",
+    }
+    if collect_metrics:
+        start_metrics(trace_memory)
+
+    processed = run_pipeline(source, outputs['rawlist'], outputs['statistics'], outputs['summary'], outputs['cards'],
+                             incremental, f"{prefix}.{CHECKPOINT_PATH}", cache_dir, cache_max_bytes, report_path=outputs['report'])
+    if processed is None:
+        return {'name': name, 'source': source, 'status': 'error', 'error': 'could not read collection'}, None, None
+    splits, stats = processed
+    save_statistics_state(stats, outputs['state'])
+
+    result = {
+        'name': name,
+        'source': source,
+        'status': 'ok',
+        'total_splits': stats.total_splits,
+        'outputs': {key: os.path.relpath(path, output_dir) for key, path in outputs.items()},
+    }
+    if collect_metrics:
+        result['metrics'] = METRICS.to_dict()
+    return result, stats.to_dict(), Leaderboards(top).add_statistics(stats, name, splits).to_dict()
+
+def run_batch(sources, output_dir=BATCH_OUTPUT_DIR, jobs=None, incremental=False, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES,
+              collect_metrics=False, trace_memory=False, top=LEADERBOARD_SIZE):
+    """Process many collection files across a process pool and write a combined index.
+
+    Every file gets its own <name>.rawlist.txt, <name>.statistics.txt,
+    <name>.summary.html, <name>.cards.html, <name>.report.html and mergeable
+    <name>.stats.json in output_dir, and
+    index.json lists them all in the order of sources. The statistics of
+    every collection are also pooled into pooled.statistics.txt,
+    pooled.summary.html and pooled.state.json, and every collection's cards ranked together in
+    leaderboards.json. With collect_metrics, every worker's stage metrics
+    are added into the current METRICS.
+    """
+    prepare_output_dir(output_dir)
+    names = batch_output_names(sources)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(process_batch_file, source, output_dir, name, incremental, cache_dir, cache_max_bytes,
+                                   collect_metrics, trace_memory, top)
+                   for source, name in zip(sources, names)]
+        results = []
+        pooled = SplitStatistics()
+        leaderboards = Leaderboards(top)
+        for source, name, future in zip(sources, names, futures):
+            try:
+                result, state, boards = future.result()
+            except Exception as e:
+                result, state, boards = {'name': name, 'source': source, 'status': 'error', 'error': repr(e)}, None, None
+            results.append(result)
+            if 'metrics' in result and METRICS.enabled:
+                METRICS.merge(result['metrics'])
+            if state is not None:
+                pooled.merge(SplitStatistics.from_dict(state))
+                leaderboards.merge(Leaderboards.from_dict(boards))
+
+    index_path = write_batch_index(output_dir, results, pooled, leaderboards)
+    print(f"Processed {len(results)} collections, index written to {index_path}")
+    return results
+
+def prepare_output_dir(output_dir):
+    """Create a batch output directory with the assets summary.html needs."""
+    os.makedirs(output_dir, exist_ok=True)
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    for asset in SUMMARY_ASSETS:
+        asset_path = os.path.join(script_dir, asset)
+        if os.path.exists(asset_path):
+            shutil.copy(asset_path, output_dir)
+
+def write_batch_index(output_dir, results, pooled, leaderboards, **extra):
+    """Write the pooled reports, leaderboards and index.json of a batch, returning the index path."""
+    if pooled.total_splits:
+        pooled_prefix = os.path.join(output_dir, BATCH_POOLED_NAME)
+        write_statistics(pooled, f"{pooled_prefix}.{STATISTICS_PATH}")
+        write_html_summary(pooled, f"{pooled_prefix}.{SUMMARY_PATH}")
+        save_statistics_state(pooled, f"{pooled_prefix}.{POOLED_STATE_SUFFIX}")
+
+    write_leaderboards(leaderboards, os.path.join(output_dir, LEADERBOARDS_NAME))
+
+    index_path = os.path.join(output_dir, BATCH_INDEX_NAME)
+    with open(index_path, 'w', encoding='utf-8') as file:
+        json.dump(dict({'collections': results}, **extra), file, indent=2)
+    return index_path
+
+def write_leaderboards(leaderboards, output_file):
+    """Save every leaderboard, best first, as JSON."""
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(leaderboards.report(), file, indent=2)
+    print(f"Leaderboards written to {output_file}")
+
+def run_ndjson(file_path, output_dir=BATCH_OUTPUT_DIR, top=LEADERBOARD_SIZE):
+    """Analyze every submission in a newline-delimited dump, one document at a time.
+
+    Each submission's statistics are saved as <dump name>-<line number>.stats.json
+    in output_dir and pooled into pooled.statistics.txt, pooled.summary.html
+    and pooled.state.json, every submission's cards are ranked together in
+    leaderboards.json, and index.json lists every submission and the line
+    numbers of the malformed lines skipped. A submission that fails to
+    analyze is skipped and listed with them, the rest of the dump carries on.
+    """
+    prepare_output_dir(output_dir)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    results = []
+    malformed = []
+    pooled = SplitStatistics()
+    leaderboards = Leaderboards(top)
+    try:
+        for line_number, table in ingest_ndjson(file_path, malformed):
+            name = f"{stem}-{line_number}"
+            try:
+                with METRICS.stage('analyze_splits'):
+                    stats = analyze_splits(table)
+                state_path = os.path.join(output_dir, f"{name}.{STATS_STATE_SUFFIX}")
+                save_statistics_state(stats, state_path)
+            except Exception as e:
+                print(f"Warning: skipping line {line_number} of {file_path}, it couldn't be analyzed: {type(e).__name__} - {e}")
+                METRICS.count('malformed_lines')
+                malformed.append(line_number)
+                continue
+            pooled.merge(stats)
+            leaderboards.add_statistics(stats, name, table)
+            results.append({
+                'name': name,
+                'source': f"{file_path}:{line_number}",
+                'status': 'ok',
+                'total_splits': stats.total_splits,
+                'outputs': {'state': os.path.relpath(state_path, output_dir)},
+            })
+    except OSError as e:
+        print(f"Error: {type(e).__name__} - {e}")
+        return None
+
+    index_path = write_batch_index(output_dir, results, pooled, leaderboards, malformed_lines=malformed)
+    print(f"Processed {len(results)} submissions, skipped {len(malformed)} malformed lines, index written to {index_path}")
+    return results
+
+class CollectionService:
+    """Keeps one collection's splits and statistics in memory, in step with the file.
+
+    refresh() only does work when the file's size or modification time
+    changed. New splits are then folded into the previous statistics, and
+    everything is recomputed only if older splits changed. The responses
+    are rendered once per update, so requests never wait on the pipeline.
+    """
+
+    def __init__(self, file_path, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES):
+        self.file_path = file_path
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        self.signature = None
+        self.table = None
+        self.state = None  # SplitStatistics.to_dict() as JSON, so resuming never shares it
+        self.time_index = None
+        self.card_index = None
+        self.responses = {}
+        self.lock = threading.Lock()
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.assets = {}
+        for asset in SUMMARY_ASSETS:
+            try:
+                with open(os.path.join(script_dir, asset), 'rb') as file:
+                    self.assets[f"/{asset}"] = (mimetypes.guess_type(asset)[0] or 'application/octet-stream', file.read())
+            except IOError:
+                continue
+
+    def refresh(self):
+        """Reload the collection if the file changed. Returns True if the statistics were updated."""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self.signature:
+            return False
+        # Remembered even if loading fails, e.g. mid-write, as the finished write changes it again
+        self.signature = signature
+
+        with METRICS.stage('refresh'):
+            table = load_collection(self.file_path, self.cache_dir, self.cache_max_bytes)
+            if table is None:
+                return False
+
+            stats = None
+            if self.table is not None:
+                last_time = self.table.times[-1] if len(self.table) else MISSING_TIME
+                resumed = extend_statistics(table, json.loads(self.state), last_time, prefix_digest(self.table, len(self.table)))
+                if resumed is not None:
+                    stats, new_splits = resumed
+                    print(f"{new_splits} new splits")
+            if stats is None:
+                stats = analyze_splits(table)
+            time_index = TimeIndex(table)
+            card_index = CardIndex(table, stats)
+
+            state = json.dumps(stats.to_dict())
+            updated = datetime.now(timezone.utc).isoformat(timespec='seconds')
+            summary = f'{{"source": {json.dumps(self.file_path)}, "updated": "{updated}", "statistics": {state}}}'
+            responses = dict(self.assets)
+            responses['/'] = responses[f"/{SUMMARY_PATH}"] = ('text/html; charset=utf-8', render_html_summary(stats).encode('utf-8'))
+            responses['/stats.json'] = ('application/json', summary.encode('utf-8'))
+            responses[f"/{CARDS_PATH}"] = ('text/html; charset=utf-8', render_card_table(card_index).encode('utf-8'))
+
+        with self.lock:
+            self.table, self.state, self.time_index, self.card_index, self.responses = table, state, time_index, card_index, responses
+        print(f"Loaded {len(table)} splits from {self.file_path}")
+        return True
+
+    def response(self, path):
+        """Return (content type, body) for a request path, or None if there is nothing there.
+
+        /window.json?start=...&end=... answers with the counters for a time
+        range from the time index, and raises ValueError for unreadable dates.
+        /card.json?id=CardDefId answers with one card's history.
+        """
+        path, _, query = path.partition('?')
+        with self.lock:
+            if path == '/window.json' and self.time_index is not None:
+                return 'application/json', json.dumps(self.window(query)).encode('utf-8')
+            if path == '/card.json' and self.card_index is not None:
+                card = self.card_index.lookup(urllib.parse.parse_qs(query).get('id', [''])[0])
+                return None if card is None else ('application/json', json.dumps(card).encode('utf-8'))
+            return self.responses.get(path)
+
+    def window(self, query):
+        """Counters between the optional start and end dates (any ISO 8601 form) of a query string."""
+        params = urllib.parse.parse_qs(query)
+        bounds = {}
+        for name in ('start', 'end'):
+            value = params.get(name, [None])[0]
+            if value is not None:
+                bounds[name] = parse_time_created(value)
+                if bounds[name] == MISSING_TIME:
+                    raise ValueError(f"Unreadable {name} date: {value}")
+        return self.time_index.window(bounds.get('start'), bounds.get('end'))
+
+def make_request_handler(service):
+    """Build a request handler class that answers from a CollectionService."""
+    class SummaryRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            try:
+                response = service.response(self.path)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            if response is None:
+                if service.table is None:
+                    self.send_error(503, "Collection not loaded yet")
+                else:
+                    self.send_error(404)
+                return
+            content_type, body = response
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console for collection updates
+
+    return SummaryRequestHandler
+
+def serve(file_path, host=SERVE_HOST, port=SERVE_PORT, interval=WATCH_INTERVAL, cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES):
+    """Serve the summary over HTTP until interrupted, reloading the collection whenever the file changes."""
+    service = CollectionService(file_path, cache_dir, cache_max_bytes)
+    service.refresh()
+    server = ThreadingHTTPServer((host, port), make_request_handler(service))
+
+    stop = threading.Event()
+    def watch():
+        while not stop.wait(interval):
+            service.refresh()
+
+    threading.Thread(target=watch, daemon=True).start()
+    print(f"Serving the summary at http://{host}:{server.server_port}/, press Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+def parse_drop_rate(value):
+    """Read an EFFECT=RATE command line argument into (effect, rate)."""
+    effect, _, rate = value.partition('=')
+    names = {name.lower(): name for name, _ in HISTORY_EFFECTS}
+    try:
+        rate = float(rate)
+    except ValueError:
+        rate = -1.0
+    if effect.lower() not in names or not 0 <= rate <= 1:
+        raise argparse.ArgumentTypeError(f"expected Ink, Gold or Kirby=RATE with RATE between 0 and 1, got {value!r}")
+    return names[effect.lower()], rate
+
+def parse_export_path(value):
+    """Check an --export path has an extension EXPORT_FORMATS knows."""
+    if export_format(value) is None:
+        raise argparse.ArgumentTypeError(f"expected a path ending in {', '.join(EXPORT_FORMATS)}, got {value!r}")
+    return value
+
 def main():
+    parser = argparse.ArgumentParser(description="Summarize the splits in your Marvel Snap collection.")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"only analyze splits added since the last run, using {CHECKPOINT_PATH}")
+    parser.add_argument('--batch', metavar='PATH',
+                        help="process every collection file in a directory, or matching a glob pattern")
+    parser.add_argument('--ndjson', metavar='PATH',
+                        help="analyze a newline-delimited dump with one CollectionState document or Cards array per line")
+    parser.add_argument('--output-dir', default=BATCH_OUTPUT_DIR,
+                        help=f"where --batch and --ndjson write their outputs (default: {BATCH_OUTPUT_DIR})")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="number of worker processes for --batch, --simulate and analyzing large collections (default: one per core)")
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help="cache parsed collections in DIR so unchanged files skip JSON decoding")
+    parser.add_argument('--cache-size', type=int, default=CACHE_MAX_BYTES // (1024 * 1024), metavar='MB',
+                        help="evict the least recently used cache entries beyond this size (default: %(default)s)")
+    parser.add_argument('--merge', metavar='STATE', nargs='+',
+                        help=f"pool saved *.{STATS_STATE_SUFFIX} files (or glob patterns) into {STATISTICS_PATH} and {SUMMARY_PATH}")
+    parser.add_argument('--top', type=int, default=LEADERBOARD_SIZE, metavar='K',
+                        help=f"entries on each leaderboard --batch, --ndjson and --merge write to {LEADERBOARDS_NAME} (default: %(default)s)")
+    parser.add_argument('--serve', action='store_true',
+                        help="keep running, watch CollectionState.json and serve the summary and stats.json over HTTP")
+    parser.add_argument('--port', type=int, default=SERVE_PORT, help="port for --serve (default: %(default)s)")
+    parser.add_argument('--simulate', type=int, default=0, metavar='N',
+                        help=f"simulate N histories per card to test how unusual its luck and droughts are, saved to {SIGNIFICANCE_PATH} (needs NumPy)")
+    parser.add_argument('--drop-rate', action='append', default=[], metavar='EFFECT=RATE', type=parse_drop_rate,
+                        help="drop rate to simulate for Ink, Gold or Kirby, e.g. Gold=0.05 (default: your own rates)")
+    parser.add_argument('--archive', nargs='?', const=ARCHIVE_PATH, metavar='DB',
+                        help=f"also keep every split in a SQLite history archive (default: {ARCHIVE_PATH})")
+    parser.add_argument('--archive-report', action='store_true',
+                        help=f"write {STATISTICS_PATH} and {SUMMARY_PATH} from every split in the archive instead of the collection")
+    parser.add_argument('--diff', nargs='?', const=FINGERPRINT_PATH, metavar='OLD',
+                        help=f"list the splits added or removed since OLD, a CollectionState.json or the fingerprints saved by "
+                             f"the last --diff run (default: {FINGERPRINT_PATH}), in {DIFF_PATH}")
+    parser.add_argument('--export', nargs='+', default=[], metavar='PATH', type=parse_export_path,
+                        help="also export every split to PATH as CSV (.csv), NDJSON (.ndjson or .jsonl) "
+                             "or Arrow IPC (.arrow or .feather, needs pyarrow)")
+    parser.add_argument('--no-rawlist', action='store_true',
+                        help=f"don't write {RAWLIST_PATH}, which takes a good part of the run on large collections")
+    parser.add_argument('--metrics-json', metavar='PATH',
+                        help="save per-stage wall and CPU times and record counts to PATH")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record each stage's peak memory with tracemalloc in --metrics-json (slower)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="save a cProfile dump of the run to PATH, e.g. for snakeviz or pstats")
+    args = parser.parse_args()
+    cache_max_bytes = args.cache_size * 1024 * 1024
+
+    if args.metrics_json:
+        start_metrics(args.trace_memory)
+    profiler = None
+    if args.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run_main(args, cache_max_bytes)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile written to {args.profile}")
+        if args.metrics_json:
+            write_metrics(METRICS, args.metrics_json)
+
+def run_main(args, cache_max_bytes):
+    """Run whichever mode the command line arguments ask for."""
+
+    if args.merge:
+        paths = [path for pattern in args.merge for path in sorted(glob.glob(pattern))]
+        if not paths:
+            print("No saved statistics found to merge")
+            return
+        pooled = SplitStatistics()
+        leaderboards = Leaderboards(args.top)
+        for path in paths:
+            stats = load_statistics_state(path)
+            pooled.merge(stats)
+            leaderboards.add_statistics(stats, os.path.basename(path).removesuffix(f".{STATS_STATE_SUFFIX}"))
+        write_statistics(pooled, STATISTICS_PATH)
+        write_html_summary(pooled, SUMMARY_PATH)
+        write_leaderboards(leaderboards, LEADERBOARDS_NAME)
+        print(f"Merged {len(paths)} saved statistics")
+        return
+
+    if args.archive_report:
+        archive_path = args.archive or ARCHIVE_PATH
+        if not os.path.exists(archive_path):
+            print(f"No history archive found at {archive_path}")
+            return
+        connection = open_archive(archive_path)
+        try:
+            stats = analyze_archive(connection)
+        finally:
+            connection.close()
+        if not stats.total_splits:
+            print(f"The history archive at {archive_path} is empty")
+            return
+        write_statistics(stats, STATISTICS_PATH)
+        write_html_summary(stats, SUMMARY_PATH)
+        print(f"Analyzed {stats.total_splits} archived splits")
+        return
+
+    if args.ndjson:
+        run_ndjson(args.ndjson, args.output_dir, args.top)
+        return
+
+    if args.batch:
+        sources = find_collection_files(args.batch)
+        if not sources:
+            print(f"No collection files found at {args.batch}")
+            return
+        run_batch(sources, args.output_dir, args.jobs, args.incremental, args.cache_dir, cache_max_bytes,
+                  bool(args.metrics_json), args.trace_memory, args.top)
+        return
+
     # Assuming CollectionState.json is located at ~/AppData/Locallow/Second Dinner/SNAP/Standalone/States/nvprod/
     file_path = os.path.expanduser('~/AppData/Locallow/Second Dinner/SNAP/Standalone/States/nvprod/CollectionState.json')
 
-    # Process the JSON file and generate the rawlist.txt
-    if not process_collection_state(file_path):
+    if args.diff:
+        run_diff(file_path, args.diff, cache_dir=args.cache_dir, cache_max_bytes=cache_max_bytes)
         return
-    
-    # Generate the statistics
-    analyze_statistics(RAWLIST_PATH, STATISTICS_PATH)
 
-    # Generate the summary as HTML
-    generate_html_summary(RAWLIST_PATH, SUMMARY_PATH)
+    if args.serve:
+        serve(file_path, port=args.port, cache_dir=args.cache_dir, cache_max_bytes=cache_max_bytes)
+        return
+
+    # Process the JSON file, analyze it and write every report
+    rawlist_path = None if args.no_rawlist else RAWLIST_PATH
+    if run_pipeline(file_path, rawlist_path, incremental=args.incremental, cache_dir=args.cache_dir, cache_max_bytes=cache_max_bytes,
+                    simulations=args.simulate, drop_rates=dict(args.drop_rate), jobs=args.jobs, archive_path=args.archive,
+                    export_paths=args.export) is None:
+        return
 
     # Open the generated HTML file in a web browser
     subprocess.Popen(['start', '', SUMMARY_PATH], shell=True)
@@ -0,0 +1,60 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_collection_state
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+class BackendsTest(unittest.TestCase):
+    """The NumPy, pure Python and sharded analyses must give identical statistics."""
+
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as work_dir:
+            collection_path = os.path.join(work_dir, 'CollectionState.json')
+            generate_collection_state(collection_path, 1500, seed=7)
+            with contextlib.redirect_stdout(io.StringIO()):
+                cls.table = ImportSnap.process_collection_state(collection_path)
+        with open(os.path.join(DATA_DIR, 'statistics.txt'), 'rb') as file:
+            cls.golden = file.read()
+
+    def backends(self):
+        """Yield (name, statistics) for every backend that can run here."""
+        if ImportSnap.np is not None:
+            yield 'vectorized', ImportSnap.analyze_table_vectorized(self.table)
+        with mock.patch.object(ImportSnap, 'np', None):
+            yield 'pure table', ImportSnap.analyze_splits(self.table)
+        yield 'pure records', ImportSnap.analyze_splits(list(self.table))
+        yield 'sharded', ImportSnap.analyze_sharded(self.table, jobs=3)
+
+    def statistics_text(self, stats):
+        with tempfile.TemporaryDirectory() as work_dir:
+            statistics_path = os.path.join(work_dir, 'statistics.txt')
+            with contextlib.redirect_stdout(io.StringIO()):
+                ImportSnap.write_statistics(stats, statistics_path)
+            with open(statistics_path, 'rb') as file:
+                return file.read()
+
+    def test_backends_agree(self):
+        # Dumped without sorting, so the order of every per-card dict has to match too
+        expected = json.dumps(ImportSnap.analyze_splits(list(self.table)).to_dict())
+        for name, stats in self.backends():
+            with self.subTest(backend=name):
+                self.assertEqual(json.dumps(stats.to_dict()), expected)
+
+    def test_backends_match_golden_statistics(self):
+        for name, stats in self.backends():
+            with self.subTest(backend=name):
+                self.assertEqual(self.statistics_text(stats), self.golden)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+class CacheTest(unittest.TestCase):
+    """--cache-dir must give the same table, counts and warnings as parsing the file."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.cache_dir = os.path.join(self.work_dir.name, 'cache')
+        self.addCleanup(setattr, ImportSnap, 'METRICS', ImportSnap.METRICS)
+        self.cards = list(generate_cards(random.Random(5), 1500))
+        self.cards[10] = dict(self.cards[10], SurfaceEffectDefId="Foil", TimeCreated="not a time")
+        self.collection_path = self.write_collection('CollectionState.json', self.cards)
+
+    def write_collection(self, name, cards):
+        path = os.path.join(self.work_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+        return path
+
+    def load(self, path=None, cache_max_bytes=ImportSnap.CACHE_MAX_BYTES):
+        """Load a collection through the cache, returning the table, its metric counts and what was printed."""
+        metrics = ImportSnap.start_metrics()
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            table = ImportSnap.load_collection(path or self.collection_path, self.cache_dir, cache_max_bytes)
+        return table, metrics.counts, output.getvalue()
+
+    def test_hit_replays_counts_and_warnings(self):
+        parsed, parsed_counts, parsed_output = self.load()
+        cached, cached_counts, cached_output = self.load()
+        self.assertNotIn('cache_hits', parsed_counts)
+        self.assertEqual(cached_counts.pop('cache_hits'), 1)
+        self.assertEqual(cached_counts, parsed_counts)
+        self.assertIn("malformed TimeCreated (first: ", cached_output)
+        self.assertEqual(cached_output, parsed_output)
+        self.assertEqual(list(cached), list(parsed))
+
+    def test_changed_file_is_parsed_again(self):
+        self.load()
+        self.write_collection('CollectionState.json', self.cards[:1000])
+        table, counts, _ = self.load()
+        self.assertNotIn('cache_hits', counts)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(list(table), list(ImportSnap.process_collection_state(self.collection_path)))
+
+    def test_truncated_entry_is_a_miss(self):
+        parsed, _, _ = self.load()
+        entry_path, = (os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                       if name.endswith(ImportSnap.CACHE_ENTRY_SUFFIX))
+        with open(entry_path, 'r+b') as file:
+            file.truncate(os.path.getsize(entry_path) // 2)
+        table, counts, _ = self.load()
+        self.assertNotIn('cache_hits', counts)
+        self.assertEqual(list(table), list(parsed))
+        self.assertEqual(self.load()[1]['cache_hits'], 1)
+
+    def test_eviction_counts_stat_files(self):
+        paths = [self.write_collection(f"Collection{index}.json", self.cards[:500 + 100 * index]) for index in range(5)]
+        for path in paths[:4]:
+            self.load(path)
+        sizes = [os.path.getsize(os.path.join(self.cache_dir, name)) for name in os.listdir(self.cache_dir)]
+        self.assertEqual(len(sizes), 8)
+
+        # Room for about two collections: the oldest entries and stat files go to make room for the new one
+        max_bytes = sum(sorted(sizes)[-4:])
+        self.load(paths[4], max_bytes)
+        names = os.listdir(self.cache_dir)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.cache_dir, name)) for name in names), max_bytes)
+        self.assertLess(sum(name.endswith(ImportSnap.CACHE_STAT_SUFFIX) for name in names), 5)
+        self.assertEqual(self.load(paths[4], max_bytes)[1]['cache_hits'], 1)
+
+    def test_unwritable_cache_still_loads(self):
+        with open(self.cache_dir, 'w', encoding='utf-8'):
+            pass  # A file where the cache directory should be
+        table, _, output = self.load()
+        self.assertIn("Not caching", output)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(list(table), list(ImportSnap.process_collection_state(self.collection_path)))
+
+if __name__ == '__main__':
+    unittest.main()
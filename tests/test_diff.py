@@ -0,0 +1,77 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+class DiffTest(unittest.TestCase):
+    """--diff must list exactly the splits that changed and the change in every statistic."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.cards = list(generate_cards(random.Random(3), 2000))
+
+    def table(self, cards):
+        path = os.path.join(self.work_dir.name, 'CollectionState.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ImportSnap.process_collection_state(path)
+
+    def fingerprint_snapshot(self, table):
+        """Save a table's fingerprints the way --diff does and read them back."""
+        path = os.path.join(self.work_dir.name, ImportSnap.FINGERPRINT_PATH)
+        ImportSnap.write_fingerprints(path, ImportSnap.split_fingerprints(table), ImportSnap.analyze_splits(table))
+        return ImportSnap.read_fingerprints(path)
+
+    def test_lists_added_and_removed_splits(self):
+        old, new = self.table(self.cards[:1500]), self.table(self.cards[100:])
+        diff = ImportSnap.diff_snapshots(new, old)
+        self.assertEqual(diff['added'], list(self.table(self.cards[1500:])))
+        self.assertEqual(diff['removed'], list(self.table(self.cards[:100])))
+
+    def test_fingerprint_file_counts_removed_splits(self):
+        old, new = self.table(self.cards[:1500]), self.table(self.cards[100:])
+        from_table = ImportSnap.diff_snapshots(new, old)
+        from_file = ImportSnap.diff_snapshots(new, self.fingerprint_snapshot(old))
+        self.assertEqual(from_file['added'], from_table['added'])
+        self.assertEqual(from_file['removed'], len(from_table['removed']))
+        self.assertEqual(from_file['changes'], from_table['changes'])
+
+    def test_changes_cover_every_statistic(self):
+        old, new = self.table(self.cards[:1500]), self.table(self.cards)
+        changes = ImportSnap.diff_snapshots(new, old)['changes']
+        old_stats, new_stats = ImportSnap.analyze_splits(old).to_dict(), ImportSnap.analyze_splits(new).to_dict()
+
+        def leaves(stats, path=()):
+            for key, value in stats.items():
+                if isinstance(value, dict):
+                    yield from leaves(value, path + (key,))
+                else:
+                    yield path + (key,), value
+
+        # Replaying the changes onto the old statistics gives the new ones
+        replayed = dict(leaves(old_stats))
+        for path, change in changes.items():
+            replayed[path] = change if isinstance(change, list) else replayed.get(path, 0) + change
+        self.assertEqual({path: value for path, value in replayed.items() if value not in (0, None)},
+                         {path: value for path, value in leaves(new_stats) if value not in (0, None)})
+        self.assertEqual(changes[('total_splits',)], new_stats['total_splits'] - old_stats['total_splits'])
+        self.assertIn(('split_tiers', '6', 'Total'), changes)
+
+    def test_unchanged_collection_has_no_changes(self):
+        table = self.table(self.cards)
+        diff = ImportSnap.diff_snapshots(table, self.fingerprint_snapshot(table))
+        self.assertEqual((diff['added'], diff['removed'], diff['changes']), ([], 0, {}))
+
+if __name__ == '__main__':
+    unittest.main()
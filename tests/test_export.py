@@ -0,0 +1,101 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+# The flag bits as published with the first exports: existing entries may never change
+PUBLISHED_FLAG_BITS = {
+    "Foil": 1, "Prism": 2, "Ink": 4, "GoldFoil": 8, "Gold": 16, "Comic": 32, "Glimmer": 64, "Sparkle": 128, "Kirby": 256,
+    "BlackFlare": 512, "GoldFlare": 1024, "GreenFlare": 2048, "BlueFlare": 4096, "RedFlare": 8192, "WhiteFlare": 16384,
+    "PurpleFlare": 32768, "RainbowFlare": 65536,
+}
+
+class ExportTest(unittest.TestCase):
+    """--export must write every split with the published columns and flag bits."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        cards = list(generate_cards(random.Random(11), 800))
+        cards[5] = dict(cards[5], CardDefId='Odd, "Card"', SurfaceEffectDefId="Foil")
+        cards[5].pop("Custom", None)
+        cards[6] = dict(cards[6], SurfaceEffectDefId="Ink", TimeCreated="not a time")
+        cards[6].pop("Custom", None)
+        collection_path = os.path.join(self.work_dir.name, 'CollectionState.json')
+        with open(collection_path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.table = ImportSnap.process_collection_state(collection_path)
+
+    def expected_rows(self):
+        """Every split as a dict of export columns, worked out split by split."""
+        counts = Counter()
+        for card_def_id, surface, reveal, time_created in self.table:
+            counts[card_def_id] += 1
+            flags = ImportSnap.surface_effect_mask(surface) | ImportSnap.reveal_effect_mask(reveal)
+            row = {'card_def_id': card_def_id, 'surface_effect_def_id': surface, 'reveal_effect_def_id': reveal or None,
+                   'time_created': ImportSnap.format_time_created(ImportSnap.parse_time_created(time_created)) or None,
+                   'split_number': counts[card_def_id], 'flags': flags}
+            row.update((rule.name.lower(), bool(flags & rule.flag)) for rule in ImportSnap.EFFECT_RULES)
+            yield row
+
+    def export(self, name):
+        path = os.path.join(self.work_dir.name, name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(ImportSnap.write_export(self.table, path, batch_size=100))
+        return path
+
+    def test_flag_bits_are_frozen(self):
+        self.assertEqual({name: bit for name, bit in ImportSnap.FLAG_BITS.items() if name in PUBLISHED_FLAG_BITS},
+                         PUBLISHED_FLAG_BITS)
+        self.assertEqual(len(set(ImportSnap.FLAG_BITS.values())), len(ImportSnap.FLAG_BITS))
+        self.assertEqual(ImportSnap.EFFECT_FLAGS["Gold"], PUBLISHED_FLAG_BITS["GoldFoil"])
+
+    def test_csv_export(self):
+        path = self.export('splits.csv')
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(list(rows[0]), [name for name, _, _ in ImportSnap.EXPORT_COLUMNS])
+        expected = [{name: '' if value is None else str(value).lower() if isinstance(value, bool) else str(value)
+                     for name, value in row.items()} for row in self.expected_rows()]
+        self.assertEqual(rows, expected)
+
+        with open(os.path.join(self.work_dir.name, f'splits.{ImportSnap.EXPORT_SCHEMA_SUFFIX}'), encoding='utf-8') as file:
+            schema = json.load(file)
+        self.assertEqual([column['name'] for column in schema['columns']], list(rows[0]))
+        self.assertEqual(schema['flag_bits'], ImportSnap.FLAG_BITS)
+
+    def test_ndjson_export(self):
+        path = self.export('splits.ndjson')
+        with open(path, encoding='utf-8') as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(rows, list(self.expected_rows()))
+        self.assertTrue(any(row['time_created'] is None for row in rows))
+        self.assertTrue(any(row['reveal_effect_def_id'] is None for row in rows))
+
+    @unittest.skipIf(ImportSnap.pa is None, "needs pyarrow")
+    def test_arrow_export(self):
+        path = self.export('splits.arrow')
+        with ImportSnap.pa.memory_map(path) as source:
+            exported = ImportSnap.pa.ipc.open_file(source).read_all()
+        self.assertEqual(exported.schema, ImportSnap.arrow_export_schema())
+        self.assertEqual(json.loads(exported.schema.metadata[b'flag_bits']), ImportSnap.FLAG_BITS)
+        rows = exported.to_pylist()
+        for row in rows:
+            if row['time_created'] is not None:
+                row['time_created'] = ImportSnap.format_time_created((row['time_created'] - ImportSnap.EPOCH) // ImportSnap.ONE_MICROSECOND)
+        self.assertEqual(rows, list(self.expected_rows()))
+
+if __name__ == '__main__':
+    unittest.main()
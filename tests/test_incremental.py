@@ -0,0 +1,61 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+class IncrementalTest(unittest.TestCase):
+    """--incremental must always end up with the same statistics as a full run."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.collection_path = os.path.join(self.work_dir.name, 'CollectionState.json')
+        self.checkpoint_path = os.path.join(self.work_dir.name, ImportSnap.CHECKPOINT_PATH)
+        self.cards = list(generate_cards(random.Random(1), 3000))
+
+    def analyze(self, cards):
+        """Write cards as the collection, then return the incremental and the full statistics."""
+        with open(self.collection_path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            table = ImportSnap.process_collection_state(self.collection_path)
+            incremental = ImportSnap.analyze_incremental(table, self.collection_path, self.checkpoint_path)
+        return incremental.to_dict(), ImportSnap.analyze_splits(table).to_dict(), output.getvalue()
+
+    def test_resumes_with_new_splits(self):
+        self.analyze(self.cards[:2000])
+        incremental, full, output = self.analyze(self.cards)
+        self.assertIn("Resumed from checkpoint", output)
+        self.assertEqual(incremental, full)
+
+    def test_recomputes_when_an_older_split_changes_effects(self):
+        self.analyze(self.cards[:2000])
+        cards = [dict(card) for card in self.cards]
+        old_split = next(card for card in cards[:2000] if not card.get("Custom") and card.get("SurfaceEffectDefId") == "Foil")
+        old_split["SurfaceEffectDefId"] = "Ink"
+        old_split["CardRevealEffectDefId"] = "Kirby"
+        incremental, full, output = self.analyze(cards)
+        self.assertIn("recomputing all splits", output)
+        self.assertEqual(incremental, full)
+
+    def test_recomputes_when_splits_swap_cards(self):
+        self.analyze(self.cards[:2000])
+        cards = [dict(card) for card in self.cards]
+        splits = [card for card in cards[:2000] if not card.get("Custom") and "SurfaceEffectDefId" in card]
+        first, second = next((a, b) for a, b in zip(splits, splits[1:]) if a["CardDefId"] != b["CardDefId"])
+        first["CardDefId"], second["CardDefId"] = second["CardDefId"], first["CardDefId"]
+        incremental, full, output = self.analyze(cards)
+        self.assertIn("recomputing all splits", output)
+        self.assertEqual(incremental, full)
+
+if __name__ == '__main__':
+    unittest.main()
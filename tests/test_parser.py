@@ -0,0 +1,79 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+CHUNK_SIZES = [1, 2, 3, 7, 64, ImportSnap.READ_CHUNK_SIZE]
+
+class ParserTest(unittest.TestCase):
+    """extract_cards_section must stream exactly the entries json.load sees, whatever the chunk size."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.addCleanup(setattr, ImportSnap, 'METRICS', ImportSnap.METRICS)
+        self.cards = list(generate_cards(random.Random(9), 300))
+        self.cards[3] = dict(self.cards[3], Note='a "quoted" ] } [ { \\ string with "Cards": [] in it', Unicode="Dééjà ☃")
+
+    def write(self, text):
+        path = os.path.join(self.work_dir.name, 'CollectionState.json')
+        with open(path, 'w', encoding='utf-8-sig') as file:
+            file.write(text)
+        return path
+
+    def document(self, indent=None):
+        """A CollectionState with deck card lists and a "Cards" string before the real array."""
+        return json.dumps({"ServerState": {
+            "$type": "ServerState",
+            "Decks": [{"Name": "Cards", "Cards": [{"CardDefId": "DeckCard"}]}],
+            "Tip": "Cards",
+            "Cards": self.cards,
+            "Later": {"Cards": [{"CardDefId": "NotThisOne"}]},
+        }}, indent=indent)
+
+    def test_matches_json_load_for_every_chunk_size(self):
+        for indent in (None, 1):
+            path = self.write(self.document(indent))
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(indent=indent, chunk_size=chunk_size):
+                    self.assertEqual(list(ImportSnap.extract_cards_section(path, chunk_size)), self.cards)
+
+    def test_empty_cards_array(self):
+        path = self.write('{"ServerState": {"Cards" : [ ] }}')
+        for chunk_size in CHUNK_SIZES:
+            self.assertEqual(list(ImportSnap.extract_cards_section(path, chunk_size)), [])
+
+    def test_missing_cards_array(self):
+        path = self.write('{"ServerState": {"Decks": [{"Cards": []}], "Note": "Cards"}}')
+        for chunk_size in CHUNK_SIZES:
+            with self.assertRaisesRegex(ValueError, "No matching section found"):
+                list(ImportSnap.extract_cards_section(path, chunk_size))
+
+    def test_truncated_file(self):
+        document = self.document()
+        for cut in (document.index('"Cards": [{"$type"') + 12, len(document) // 2, document.index('], "Later"') - 3):
+            path = self.write(document[:cut])
+            for chunk_size in CHUNK_SIZES:
+                with self.subTest(cut=cut, chunk_size=chunk_size), self.assertRaises(json.JSONDecodeError):
+                    list(ImportSnap.extract_cards_section(path, chunk_size))
+
+    def test_malformed_entry_fails_fast(self):
+        # A bad entry early on must raise without reading the rest of the file
+        entries = [json.dumps(card) for card in self.cards * 20]
+        entries[2] = '{"CardDefId": "Broken", "SurfaceEffectDefId": Foil}'
+        path = self.write('{"ServerState": {"Cards": [' + ', '.join(entries) + ']}}')
+        for chunk_size in (64, 4096):
+            metrics = ImportSnap.start_metrics()
+            with self.subTest(chunk_size=chunk_size), self.assertRaises(json.JSONDecodeError):
+                list(ImportSnap.extract_cards_section(path, chunk_size))
+            self.assertLess(metrics.stages['read_file']['calls'] * chunk_size, os.path.getsize(path) // 10)
+
+if __name__ == '__main__':
+    unittest.main()
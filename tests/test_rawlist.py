@@ -0,0 +1,47 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+
+class RawlistTest(unittest.TestCase):
+    """rawlist.txt must show every TimeCreated exactly as the collection has it."""
+
+    TIMES = ["2023-01-02T03:04:05.678Z", "2023-01-02T03:04:05.678901Z", "2023-01-02T03:04:05.6789012Z",
+             "2023-01-02T03:04:05Z", "2023-01-01T03:04:05.678+00:00", "2023-13-02T03:04:05.678Z", "garbage", ""]
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        self.collection_path = os.path.join(self.work_dir.name, 'CollectionState.json')
+        cards = [{"CardDefId": f"Card{index}", "SurfaceEffectDefId": "Foil", "TimeCreated": time_created}
+                 for index, time_created in enumerate(self.TIMES)]
+        with open(self.collection_path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+
+    def rawlist_times(self, table):
+        rawlist_path = os.path.join(self.work_dir.name, 'rawlist.txt')
+        with contextlib.redirect_stdout(io.StringIO()):
+            ImportSnap.write_rawlist(table, rawlist_path)
+        with open(rawlist_path, encoding='utf-8') as file:
+            return {line.split(' ', 3)[0]: line.split(' ', 3)[3].rstrip('\n') for line in file}
+
+    def test_keeps_times_that_dont_round_trip(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            table = ImportSnap.process_collection_state(self.collection_path)
+        expected = {f"Card{index}": time_created for index, time_created in enumerate(self.TIMES)}
+        self.assertEqual(self.rawlist_times(table), expected)
+
+        # The cache keeps them too
+        entry_path = os.path.join(self.work_dir.name, 'entry.splits')
+        ImportSnap.write_split_cache(table, entry_path)
+        self.assertEqual(self.rawlist_times(ImportSnap.read_split_cache(entry_path)), expected)
+
+if __name__ == '__main__':
+    unittest.main()
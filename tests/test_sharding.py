@@ -0,0 +1,96 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_cards
+
+class ShardingTest(unittest.TestCase):
+    """Analyzing a collection in card shards must give exactly the serial statistics."""
+
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        cards = list(generate_cards(random.Random(4), 2500))
+        # Streaks that run across several cards, which no single shard sees whole
+        for index, card_def_id in enumerate(["StreakA", "StreakB", "StreakC", "StreakD", "StreakA"] * 6):
+            cards.append({"CardDefId": card_def_id, "SurfaceEffectDefId": "GoldFoil" if index < 20 else "Ink",
+                          "CardRevealEffectDefId": "Kirby", "TimeCreated": f"2025-01-01T00:00:{index:02d}.000Z"})
+        self.collection_path = self.write_collection('CollectionState.json', cards)
+        self.table = self.load(self.collection_path)
+
+    def write_collection(self, name, cards):
+        path = os.path.join(self.work_dir.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({"ServerState": {"Cards": cards}}, file)
+        return path
+
+    def load(self, path):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ImportSnap.process_collection_state(path)
+
+    def assertSameStatistics(self, sharded, serial):
+        # Dumped without sorting, so the per-card entries have to come in the same order too
+        self.assertEqual(json.dumps(sharded.to_dict()), json.dumps(serial.to_dict()))
+
+    def test_shards_partition_the_table_by_card(self):
+        rows = list(zip(*(getattr(self.table, name) for name in ImportSnap.SplitTable.COLUMNS)))
+        for shards in (1, 3, 8):
+            parts = ImportSnap.shard_table(self.table, shards)
+            with mock.patch.object(ImportSnap, 'np', None):
+                self.assertEqual(ImportSnap.shard_table(self.table, shards), parts)
+            part_rows = [list(zip(*part)) for part in parts]
+            for shard, shard_rows in enumerate(part_rows):
+                # Every shard keeps the table order and only holds its own cards
+                self.assertEqual(shard_rows, [row for row in rows if row[0] % shards == shard])
+            self.assertEqual(sum(map(len, part_rows)), len(rows))
+
+    def test_streaks_match_the_serial_pass(self):
+        serial = ImportSnap.analyze_splits(list(self.table))
+        self.assertEqual(ImportSnap.table_streaks(self.table), (serial.streaks, serial.current_streak))
+        self.assertGreaterEqual(serial.streaks['highest_gold_streak']['length'], 20)
+
+    def test_sharded_matches_serial(self):
+        serial = ImportSnap.analyze_splits(list(self.table))
+        for jobs in (1, 2, 5):
+            with self.subTest(jobs=jobs):
+                self.assertSameStatistics(ImportSnap.analyze_sharded(self.table, jobs), serial)
+
+    def test_more_jobs_than_cards(self):
+        table = self.load(self.write_collection('Few.json', [
+            {"CardDefId": card_def_id, "SurfaceEffectDefId": "Ink", "TimeCreated": f"2025-01-0{day}T00:00:00.000Z"}
+            for day, card_def_id in enumerate(["A", "B", "A", "C", "A"], start=1)]))
+        self.assertSameStatistics(ImportSnap.analyze_sharded(table, 6), ImportSnap.analyze_splits(list(table)))
+        self.assertSameStatistics(ImportSnap.analyze_sharded(ImportSnap.SplitTable(), 3), ImportSnap.SplitStatistics())
+
+    def test_pipeline_shards_large_collections(self):
+        def run(output_dir, jobs):
+            os.makedirs(output_dir)
+            paths = {name: os.path.join(output_dir, name) for name in
+                     ('rawlist.txt', 'statistics.txt', 'summary.html', 'cards.html', 'report.html')}
+            with contextlib.redirect_stdout(io.StringIO()):
+                ImportSnap.run_pipeline(self.collection_path, paths['rawlist.txt'], paths['statistics.txt'], paths['summary.html'],
+                                        paths['cards.html'], jobs=jobs, report_path=paths['report.html'])
+            outputs = {}
+            for name, path in paths.items():
+                with open(path, 'rb') as file:
+                    outputs[name] = file.read()
+            return outputs
+
+        serial = run(os.path.join(self.work_dir.name, 'serial'), 1)
+        with mock.patch.object(ImportSnap, 'SHARD_MIN_SPLITS', 1000), \
+                mock.patch.object(ImportSnap, 'analyze_sharded', wraps=ImportSnap.analyze_sharded) as analyze_sharded:
+            sharded = run(os.path.join(self.work_dir.name, 'sharded'), 3)
+        analyze_sharded.assert_called_once()
+        self.assertEqual(sharded, serial)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ImportSnap
+from GenerateSnap import generate_collection_state
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+class StatisticsTest(unittest.TestCase):
+    """statistics.txt must stay byte for byte what the original script wrote."""
+
+    def test_matches_golden_statistics(self):
+        # tests/data/statistics.txt is the original ImportSnap.py's report for this collection
+        with tempfile.TemporaryDirectory() as work_dir:
+            collection_path = os.path.join(work_dir, 'CollectionState.json')
+            statistics_path = os.path.join(work_dir, 'statistics.txt')
+            generate_collection_state(collection_path, 1500, seed=7)
+            with contextlib.redirect_stdout(io.StringIO()):
+                table = ImportSnap.process_collection_state(collection_path)
+                ImportSnap.write_statistics(ImportSnap.analyze_splits(table), statistics_path)
+            with open(statistics_path, 'rb') as file:
+                written = file.read()
+        with open(os.path.join(DATA_DIR, 'statistics.txt'), 'rb') as file:
+            self.assertEqual(written, file.read())
+
+if __name__ == '__main__':
+    unittest.main()